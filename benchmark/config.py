@@ -1,13 +1,23 @@
+import hashlib
 import os
 import random
 
-from jinja2 import Environment, FileSystemLoader, TemplateNotFound
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template, TemplateNotFound, meta
 
+from benchmark import instrumentation
 from utils.problem_type import ProblemType
 
 
+TEMPLATE_DIR: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts")
+TEMPLATE_CACHE_DIR: str | None = os.environ.get("DINOS_TEMPLATE_CACHE_DIR")  # None uses Jinja's per-user temporary directory
+
+# Shared by every Config in the process, keyed by (template_dir, languages, fallback_language)
+_environments: dict[tuple, Environment] = {}
+_templates: dict[tuple, Template] = {}
+
+
 class Config:
-    def __init__(self, seed: int | None = None, template_dir: str = "benchmark/prompts", languages: list[str] = ["en"], fallback_language: str | None = "en"):
+    def __init__(self, seed: int | None = None, template_dir: str = TEMPLATE_DIR, languages: list[str] = ["en"], fallback_language: str | None = "en", name_corpus: str = "default", example_pool: "ExamplePool | None" = None, problem_parameters: dict[str, dict] | None = None):
         self.supported_languages: list[str] = ["en"]
 
         self.seed: int = seed if seed is not None else random.randint(0, int(1e8))
@@ -15,19 +25,40 @@ class Config:
         self.template_dir: str = template_dir
         self.languages: list[str] = languages if languages else self.supported_languages
         self.fallback_language: str | None = fallback_language  # Allows for strict evaluation, without a fallback language
+        self.name_corpus: str = name_corpus  # Key into the utils.names registry
+        self.example_pool: "ExamplePool | None" = example_pool  # None generates fresh few-shot examples for every problem
+        self.problem_parameters: dict[str, dict] = problem_parameters or {}  # Problem class name -> arguments to its generate
         
+        self.env_key: tuple = (self.template_dir, tuple(self.languages), self.fallback_language)
         self.env: Environment = self._create_env()
 
     def _create_env(self) -> Environment:
+        env = _environments.get(self.env_key)
+        if env is not None:
+            return env
+
         language_dirs = [os.path.join(self.template_dir, lang) for lang in self.languages]
-        fallback_dir = os.path.join(self.template_dir, self.fallback_language)
-        
-        loader = FileSystemLoader(language_dirs + [fallback_dir])
-        env = Environment(loader=loader)
-        
+        if self.fallback_language is not None:
+            language_dirs.append(os.path.join(self.template_dir, self.fallback_language))
+
+        if TEMPLATE_CACHE_DIR is not None:
+            os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+
+        # Templates don't change during a run, so Jinja never needs to re-check the files once compiled
+        loader = FileSystemLoader(language_dirs)
+        env = Environment(loader=loader, auto_reload=False, cache_size=-1, bytecode_cache=FileSystemBytecodeCache(TEMPLATE_CACHE_DIR))
+        _environments[self.env_key] = env
+
         return env
-    
-    def get_template(self, template_name: str) -> str:
+
+    def get_template(self, template_name: str) -> Template:
+        template = _templates.get((self.env_key, template_name))
+        if template is None:
+            template = _templates[(self.env_key, template_name)] = self._resolve_template(template_name)
+
+        return template
+
+    def _resolve_template(self, template_name: str) -> Template:
         try:
             return self.env.get_template(template_name)
         except TemplateNotFound:
@@ -39,12 +70,34 @@ class Config:
                     continue
             raise ValueError(f"Template '{template_name}' not found in any of the specified languages or fallback language '{self.fallback_language}'")
 
+    def template_hash(self, template_name: str) -> str:
+        # Covers the template and every template it includes, so editing any of their files changes it
+        sources = {}
+        pending = [template_name]
+        while pending:
+            name = pending.pop()
+            if name in sources:
+                continue
+            with open(self.get_template(name).filename, 'rb') as f:
+                sources[name] = f.read()
+            pending.extend(included for included in meta.find_referenced_templates(self.env.parse(sources[name].decode())) if included is not None)
+
+        digest = hashlib.sha256()
+        for name in sorted(sources):
+            digest.update(name.encode() + b"\0" + sources[name] + b"\0")
+        return digest.hexdigest()[:16]
+
     def render_template(self, problem: "BaseProblem", examples: list["BaseProblem"] | None = None, **kwargs) -> str:
         template = self.get_template(problem.problem_name + ".jinja")
-        rendered_template = template.render(Problem=problem, ProblemType=ProblemType, examples=examples, **kwargs)
+        with instrumentation.stage("render"):
+            rendered_template = template.render(Problem=problem, ProblemType=ProblemType, examples=examples, **kwargs)
         
         return rendered_template.strip()
 
-    def increment_seed(self) -> None:
-        self.seed += 1
+    def set_seed(self, seed: int) -> None:
+        self.seed = seed
         self.rng.seed(self.seed)
+
+    def increment_seed(self) -> None:
+        instrumentation.count("seed_increments")
+        self.set_seed(self.seed + 1)
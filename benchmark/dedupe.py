@@ -0,0 +1,111 @@
+import hashlib
+import math
+from array import array
+
+
+DEDUPE_MODES: list[str] = ["exact", "bloom"]
+
+
+def prompt_hash(prompt: str) -> bytes:
+    return hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).digest()
+
+
+class HashedPromptSet:
+    # Open addressing table of 64 bit prompt hashes, about 12 bytes per prompt instead of the prompt itself.
+    # Two different prompts only look alike if their hashes collide, a chance of about 3 in a million across 10M prompts.
+    def __init__(self, capacity: int = 1024) -> None:
+        self.size: int = 0
+        self.slots: array = array("Q", bytes(8 * self._num_slots(capacity)))
+        self.mask: int = len(self.slots) - 1
+
+    @staticmethod
+    def _num_slots(capacity: int) -> int:
+        # Stays at most two thirds full, so probe sequences remain short
+        return 1 << max(4, math.ceil(math.log2(capacity * 3 / 2 + 1)))
+
+    def _insert(self, value: int) -> bool:
+        slots, mask = self.slots, self.mask
+        i = value & mask
+        while True:
+            slot = slots[i]
+            if slot == 0:
+                slots[i] = value
+                return True
+            if slot == value:
+                return False
+            i = (i + 1) & mask
+
+    def add(self, prompt: str) -> bool:
+        # Returns False if the prompt was already in the set
+        value = int.from_bytes(prompt_hash(prompt)[:8], "little") or 1  # 0 marks an empty slot
+        if not self._insert(value):
+            return False
+
+        self.size += 1
+        if self.size * 3 > len(self.slots) * 2:
+            old_slots = self.slots
+            self.slots = array("Q", bytes(8 * self._num_slots(self.size * 2)))
+            self.mask = len(self.slots) - 1
+            for value in old_slots:
+                if value:
+                    self._insert(value)
+        return True
+
+    def __len__(self) -> int:
+        return self.size
+
+
+class BloomFilter:
+    # Fixed memory set, sized for capacity prompts at the given false positive rate, e.g. 18 MB for 10M prompts at 0.001.
+    # A false positive only makes a new prompt look like a duplicate, so it is regenerated without need, duplicates are never kept.
+    def __init__(self, capacity: int, error_rate: float = 0.001) -> None:
+        if capacity < 1 or not 0 < error_rate < 1:
+            raise ValueError("capacity must be >= 1 and error_rate between 0 and 1")
+
+        self.num_bits: int = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.num_hashes: int = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits: bytearray = bytearray((self.num_bits + 7) // 8)
+        self.size: int = 0
+
+    def add(self, prompt: str) -> bool:
+        # Returns False if the prompt was, or appears to have been, added before
+        digest = prompt_hash(prompt)
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        bits, num_bits = self.bits, self.num_bits
+        is_new = False
+        for i in range(self.num_hashes):
+            bit = (h1 + i * h2) % num_bits
+            byte, mask = bit >> 3, 1 << (bit & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                is_new = True
+
+        self.size += is_new
+        return is_new
+
+    def __len__(self) -> int:
+        return self.size
+
+
+class PromptDeduplicator:
+    def __init__(self, mode: str = "exact", capacity: int = 1024, error_rate: float = 0.001) -> None:
+        if mode not in DEDUPE_MODES:
+            raise ValueError(f"Unknown dedupe mode '{mode}', use one of {DEDUPE_MODES}")
+
+        self.mode: str = mode
+        self.prompts: HashedPromptSet | BloomFilter = HashedPromptSet(capacity) if mode == "exact" else BloomFilter(capacity, error_rate)
+        self.classes: dict[str, dict[str, int]] = {}
+
+    def add(self, prompt: str, key: str | None = None) -> bool:
+        # Counts unique prompts and duplicates under key, usually the problem class name
+        is_new = self.prompts.add(prompt)
+        if key is not None:
+            counts = self.classes.get(key)
+            if counts is None:
+                counts = self.classes[key] = {"problems": 0, "duplicates": 0}
+            counts["problems" if is_new else "duplicates"] += 1
+        return is_new
+
+    def report(self) -> dict[str, dict]:
+        # Duplicate rate is the share of generated prompts that had been generated before
+        return {key: dict(counts, duplicate_rate=counts["duplicates"] / (counts["problems"] + counts["duplicates"])) for key, counts in sorted(self.classes.items())}
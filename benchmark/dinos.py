@@ -1,75 +1,456 @@
 import argparse
+import contextlib
 import json
+import multiprocessing
+import os
 import random
+import time
+import warnings
+from typing import Iterator
 
 from tqdm import tqdm
 
 from benchmark.problems.problem import BaseProblem
 from utils.problem_type import ProblemType
+from benchmark import instrumentation
 from benchmark.config import Config
+from benchmark.dedupe import DEDUPE_MODES, PromptDeduplicator
+from benchmark.examples import ExamplePool
+from benchmark.long_context import fit_problem_parameters
+from benchmark.records import ProblemRecord
+from benchmark.registry import DEFAULT_PROBLEMS, get_problem_weights, load_problem_class, parse_problems
+from benchmark.render import language_path, render_benchmark, template_hashes
+from benchmark.storage import DinosBenchmarkReader, header_indices, is_dinos, is_jsonl, iter_jsonl, open_benchmark_writer, read_jsonl_header, shard_indices, split_compression
 
-from benchmark.problems.boolean_expression_problem import BooleanExpressionResponseProblem, BooleanExpressionMultipleChoiceProblem
-from benchmark.problems.dyck_language_problem import DyckLanguageResponseProblem, DyckLanguageMultipleChoiceProblem
-from benchmark.problems.liar_problem import LiarResponseProblem, LiarMultipleChoiceProblem
-from benchmark.problems.logical_deduction_n_people_problem import LogicalDeductionNPeopleResponseProblem, LogicalDeductionNPeopleMultipleChoiceProblem
-from benchmark.problems.math_expression_problem import MathExpressionResponseProblem, MathExpressionMultipleChoiceProblem
-from benchmark.problems.navigate_problem import NavigateResponseProblem, NavigateMultipleChoiceProblem
-from benchmark.problems.people_sorting_problem import PeopleSortingResponseProblem, PeopleSortingMultipleChoiceProblem
-
-problem_classes: list[BaseProblem] = [
-    # BooleanExpressionResponseProblem, 
-    # BooleanExpressionMultipleChoiceProblem, 
-    # DyckLanguageResponseProblem, 
-    # DyckLanguageMultipleChoiceProblem, 
-    # LiarResponseProblem, 
-    # LiarMultipleChoiceProblem, 
-    # LogicalDeductionNPeopleResponseProblem,
-    # LogicalDeductionNPeopleMultipleChoiceProblem,
-    # MathExpressionResponseProblem, 
-    # MathExpressionMultipleChoiceProblem, 
-    # NavigateResponseProblem, 
-    # NavigateMultipleChoiceProblem,
-    PeopleSortingResponseProblem,
-    PeopleSortingMultipleChoiceProblem
-]
-
-def generate_benchmark(seed: int | None = None, num_problems: int = 1000, max_problem_types: int = None, num_shots: int = 0) -> dict[str, dict]:
-    SEED_MULTIPLIER: int = 1000000  # Problems sometimes iterate through seeds and this avoids collisions
-    problems: dict = {}
-
-    config = Config(seed=seed)
-
-    selected_problem_classes = problem_classes
-    if max_problem_types is not None:
-        selected_problem_classes = random.sample(problem_classes, min(max_problem_types, len(problem_classes)))
 
-    for i in tqdm(range(num_problems)):
-        config.increment_seed()
-        problem = config.rng.choice(selected_problem_classes)(config=config)
-        problem.generate()
+SEED_MULTIPLIER: int = 1000000  # Problems sometimes iterate through seeds and this avoids collisions
+RETRY_SEED_STEP: int = 1000  # Seed offset between attempts at one index when a prompt is regenerated
+MAX_DEDUPE_ATTEMPTS: int = 100
+GENERATE_CHUNK: int = 4096  # Indices generated together, so classes with a generate_batch can draw them at once
+MIN_BATCH_SIZE: int = 512  # Fewer problems of a class in a chunk are generated one by one, a batch has a fixed cost of a few ms
+# Seeds generate_batch is checked against generate with, multi word seeds included since they are seeded differently
+BATCH_CHECK_SEEDS: list[int] = list(range(1, 65)) + [2 ** 31 - 1, 2 ** 32, 2 ** 32 + 7, 2 ** 64 + 5, 10 ** 30]
+
+_worker_state: dict = {}
+_batch_checks: dict[tuple, bool] = {}  # (problem class, generate arguments) -> whether generate_batch matched generate
+
+
+def get_problem_seed(seed: int, index: int) -> int:
+    # Each index owns its own block of seeds, so a problem never depends on the ones generated before it
+    return seed + index * SEED_MULTIPLIER
+
+def parse_shard(spec: str) -> tuple[int, int]:
+    # "i/N" -> (i, N), shards are numbered from 0
+    shard, _, num_shards = spec.partition("/")
+    try:
+        shard, num_shards = int(shard), int(num_shards)
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}', use i/N, e.g. 0/4") from None
+    if not 0 <= shard < num_shards:
+        raise ValueError(f"Shard {shard} doesn't exist, shards of {num_shards} are numbered 0 to {num_shards - 1}")
+    return shard, num_shards
+
+def _generation_config(seed: int, example_pool: ExamplePool | None = None, config_options: dict | None = None) -> Config:
+    return Config(seed=seed, example_pool=example_pool, **(config_options or {}))
+
+def generation_options(selected_problem_classes: list[BaseProblem], seed: int, num_shots: int = 0, target_tokens: int | None = None, name_corpus: str | None = None, language: str | None = None) -> dict:
+    # Config arguments shared by every problem of a benchmark. With target_tokens, each class gets the size whose prompts
+    # are about that many tokens long, and names come from the synthetic corpus unless another one is given.
+    config_options = {}
+    if language is not None:
+        config_options["languages"] = [language]
+    if name_corpus is None and target_tokens is not None:
+        name_corpus = "synthetic"  # Long prompts need more people than there are real names
+    if name_corpus is not None:
+        config_options["name_corpus"] = name_corpus
+    if target_tokens is not None:
+        config_options["problem_parameters"] = fit_problem_parameters(selected_problem_classes, target_tokens, num_shots, seed, config_options)
+    return config_options
+
+def _header_config_options(header: dict) -> dict:
+    config_options = {key: header[key] for key in ("name_corpus", "problem_parameters") if key in header}
+    if "language" in header:
+        config_options["languages"] = [header["language"]]
+    return config_options
+
+def choose_problem_class(config: Config, seed: int, index: int, selected_problem_classes: list[BaseProblem], problem_weights: list[float] | None = None) -> BaseProblem:
+    config.set_seed(get_problem_seed(seed, index))
+    if problem_weights is None:
+        return config.rng.choice(selected_problem_classes)
+    return config.rng.choices(selected_problem_classes, weights=problem_weights)[0]
+
+def generate_record(config: Config, seed: int, index: int, selected_problem_classes: list[BaseProblem], num_shots: int = 0, attempt: int = 0, problem_weights: list[float] | None = None, keep_state: bool = False, problem_class: BaseProblem | None = None, draws: dict | None = None) -> tuple[str, ProblemRecord]:
+    # Only the record outlives this call, the problem, its options and the generator state behind them are released.
+    # problem_class is the class choose_problem_class picked for the index, if the caller already chose it.
+    if problem_class is None:
+        problem_class = choose_problem_class(config, seed, index, selected_problem_classes, problem_weights)
+    else:
+        config.seed = get_problem_seed(seed, index)  # The problem reseeds the rng from the seed, so only the seed is set
+    if attempt:
+        # A retry keeps the class, so regenerating duplicates doesn't change the mix of classes
+        config.set_seed(get_problem_seed(seed, index) + attempt * RETRY_SEED_STEP)
+    instrumentation.begin_problem(problem_class.__name__)
+    problem = problem_class(config=config)
+    with instrumentation.stage("generate"):
+        if draws is not None:
+            problem.generate(**config.problem_parameters.get(problem_class.__name__, {}), draws=draws)
+        else:
+            problem.generate(**config.problem_parameters.get(problem_class.__name__, {}))
+    with instrumentation.stage("generate_prompt"):
         problem.generate_prompt(num_shots=num_shots)
-        problem_json: dict = problem.generate_problem_json(i)
-        problem_key = next(iter(problem_json))  # Get the first (and only) key from the dictionary
-        problems[problem_key] = problem_json[problem_key]
+    with instrumentation.stage("serialize"):
+        record = problem.to_record()
+        if keep_state:
+            record = record.with_state(problem.to_state())
+
+    return str(index), record
+
+def batch_matches_generate(problem_class: BaseProblem, parameters: dict) -> bool:
+    # generate_batch replays CPython's Mersenne Twister and random's rejection sampling, which Python doesn't promise to
+    # keep. So it is only used once it gave the same problems and left the rng in the same state as generate on this
+    # interpreter, checked once per process. Otherwise, or without numpy, the problems are generated one by one.
+    key = (problem_class, json.dumps(parameters, sort_keys=True))
+    if key not in _batch_checks:
+        try:
+            batch = problem_class.generate_batch(BATCH_CHECK_SEEDS, **parameters)
+        except ImportError:
+            _batch_checks[key] = False
+            return False
+
+        matches = True
+        for problem_seed, draws in zip(BATCH_CHECK_SEEDS, batch):
+            # The seed a problem is constructed with is incremented before generate, see BaseProblem.__init__
+            scalar, batched = problem_class(config=Config(seed=problem_seed - 1)), problem_class(config=Config(seed=problem_seed - 1))
+            scalar.generate(**parameters)
+            batched.generate(**parameters, draws=draws)
+            if {name: value for name, value in vars(scalar).items() if name != "config"} != {name: value for name, value in vars(batched).items() if name != "config"} or scalar.config.rng.getstate() != batched.config.rng.getstate():
+                matches = False
+                break
+
+        if not matches:
+            warnings.warn(f"{problem_class.__name__}.generate_batch doesn't match generate on this Python version, its problems are generated one by one")
+        _batch_checks[key] = matches
+
+    return _batch_checks[key]
+
+def batch_draws(config: Config, seed: int, indices: range, problem_classes: list[BaseProblem]) -> dict[int, dict]:
+    # Random choices of the problems whose class has a generate_batch that passed batch_matches_generate, drawn for all
+    # of them at once. problem_classes is the class of each index. generate_record passes the draws to generate, which
+    # draws itself if they don't match its seed.
+    by_class: dict[BaseProblem, list[int]] = {}
+    for index, problem_class in zip(indices, problem_classes):
+        if hasattr(problem_class, "generate_batch"):
+            by_class.setdefault(problem_class, []).append(index)
+
+    draws = {}
+    for problem_class, class_indices in by_class.items():
+        if len(class_indices) < MIN_BATCH_SIZE:
+            continue
+        parameters = config.problem_parameters.get(problem_class.__name__, {})
+        if not batch_matches_generate(problem_class, parameters):
+            continue
+        seeds = [get_problem_seed(seed, index) + 1 for index in class_indices]  # BaseProblem.__init__ increments the seed
+        batch = problem_class.generate_batch(seeds, **parameters)
+        draws.update((index, problem_draws) for index, problem_draws in zip(class_indices, batch) if problem_draws is not None)
+    return draws
+
+def generate_chunk(config: Config, seed: int, indices: range, selected_problem_classes: list[BaseProblem], num_shots: int = 0, problem_weights: list[float] | None = None, keep_state: bool = False) -> list[tuple[str, ProblemRecord]]:
+    # Same records as generate_record for each index. When enough of the indices may belong to a class with a
+    # generate_batch, the classes are chosen up front and that class' random choices are drawn in one batch.
+    weights = problem_weights or [1] * len(selected_problem_classes)
+    expected = max((weight / sum(weights) * len(indices) for problem_class, weight in zip(selected_problem_classes, weights) if hasattr(problem_class, "generate_batch")), default=0)
+    if expected < MIN_BATCH_SIZE / 2:
+        return [generate_record(config, seed, index, selected_problem_classes, num_shots, problem_weights=problem_weights, keep_state=keep_state) for index in indices]
+
+    with instrumentation.stage("batch_draws", instrumentation.PIPELINE):
+        problem_classes = [choose_problem_class(config, seed, index, selected_problem_classes, problem_weights) for index in indices]
+        draws = batch_draws(config, seed, indices, problem_classes)
+    return [generate_record(config, seed, index, selected_problem_classes, num_shots, problem_weights=problem_weights, keep_state=keep_state, problem_class=problem_class, draws=draws.get(index)) for index, problem_class in zip(indices, problem_classes)]
+
+def generate_problem(config: Config, seed: int, index: int, selected_problem_classes: list[BaseProblem], num_shots: int = 0, problem_weights: list[float] | None = None) -> tuple[str, dict]:
+    problem_key, record = generate_record(config, seed, index, selected_problem_classes, num_shots, problem_weights=problem_weights)
+    return problem_key, record.to_json()
+
+def _init_worker(seed: int, selected_problem_classes: list[BaseProblem], num_shots: int, example_pool: ExamplePool | None, profile: bool, problem_weights: list[float] | None = None, keep_state: bool = False, config_options: dict | None = None) -> None:
+    # Classes are pickled by module and name, so a worker only imports the modules of the selected classes
+    if profile:
+        instrumentation.enable()
+    _worker_state["config"] = _generation_config(seed, example_pool, config_options)
+    _worker_state["seed"] = seed
+    _worker_state["selected_problem_classes"] = selected_problem_classes
+    _worker_state["num_shots"] = num_shots
+    _worker_state["problem_weights"] = problem_weights
+    _worker_state["keep_state"] = keep_state
+
+def _generate_chunk_in_worker(indices: range) -> tuple[list[tuple[str, ProblemRecord]], dict, dict | None]:
+    config = _worker_state["config"]
+    problems = generate_chunk(config, _worker_state["seed"], indices, _worker_state["selected_problem_classes"], _worker_state["num_shots"], _worker_state["problem_weights"], _worker_state["keep_state"])
+    new_example_pools = config.example_pool.take_new_pools() if config.example_pool is not None else {}
+    profile = instrumentation.get_profile()
+
+    return problems, new_example_pools, profile.take() if profile is not None else None
+
+def iter_problems(seed: int, indices: range, selected_problem_classes: list[BaseProblem], num_shots: int = 0, workers: int = 1, example_pool: ExamplePool | None = None, problem_weights: list[float] | None = None, keep_state: bool = False, config_options: dict | None = None) -> Iterator[tuple[str, ProblemRecord]]:
+    if workers < 1:
+        raise ValueError("workers must be >= 1")
+
+    if workers == 1:
+        config = _generation_config(seed, example_pool, config_options)
+        for start in range(0, len(indices), GENERATE_CHUNK):
+            yield from generate_chunk(config, seed, indices[start:start + GENERATE_CHUNK], selected_problem_classes, num_shots, problem_weights, keep_state)
+        return
+
+    # imap keeps the chunks in index order, so the output does not depend on the number of workers
+    chunk_size = max(1, min(GENERATE_CHUNK, len(indices) // (workers * 4)))
+    chunks = (indices[start:start + chunk_size] for start in range(0, len(indices), chunk_size))
+    profile = instrumentation.get_profile()
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(seed, selected_problem_classes, num_shots, example_pool, profile is not None, problem_weights, keep_state, config_options)) as pool:
+        for problems, new_example_pools, worker_profile in pool.imap(_generate_chunk_in_worker, chunks):
+            if example_pool is not None:
+                example_pool.add_pools(new_example_pools)  # Keeps the parent's pool complete so it can be saved
+            if worker_profile is not None:
+                profile.merge(worker_profile)
+            yield from problems
+
+def dedupe_problems(problems: Iterator[tuple[str, ProblemRecord]], deduplicator: PromptDeduplicator, seed: int, selected_problem_classes: list[BaseProblem], num_shots: int = 0, example_pool: ExamplePool | None = None, problem_weights: list[float] | None = None, keep_state: bool = False, config_options: dict | None = None) -> Iterator[tuple[str, ProblemRecord]]:
+    # Runs in the main process on problems in index order, so which ones are regenerated doesn't depend on the number of workers
+    config = _generation_config(seed, example_pool, config_options)
+    for problem_key, problem in problems:
+        index = int(problem_key)
+        problem_class_name = choose_problem_class(config, seed, index, selected_problem_classes, problem_weights).__name__
+        attempt = 0
+        while not deduplicator.add(problem.prompt, problem_class_name):
+            attempt += 1
+            if attempt > MAX_DEDUPE_ATTEMPTS:
+                raise ValueError(f"Problem {index} of {problem_class_name} was still a duplicate after {MAX_DEDUPE_ATTEMPTS} attempts, its parameters allow too few distinct prompts")
+            problem_key, problem = generate_record(config, seed, index, selected_problem_classes, num_shots, attempt, problem_weights, keep_state)
+        yield problem_key, problem
 
-    return {"seed": config.seed, "problems": problems}
+def print_dedupe_report(deduplicator: PromptDeduplicator) -> None:
+    for problem_class_name, counts in deduplicator.report().items():
+        print(f"{problem_class_name}: {counts['duplicates']} duplicates regenerated, {counts['duplicate_rate']:.2%} of {counts['problems'] + counts['duplicates']} generated prompts")
+
+def select_problem_classes(max_problem_types: int | None = None, seed: int | None = None, problems: dict[str, float | None] | None = None) -> tuple[list[BaseProblem], list[float] | None]:
+    # Seeded, so the classes of a benchmark can be recovered from its seed. Only the selected classes are imported.
+    names = list(problems) if problems is not None else DEFAULT_PROBLEMS
+    if max_problem_types is not None:
+        names = random.Random(seed).sample(names, min(max_problem_types, len(names)))
+    return [load_problem_class(name) for name in names], get_problem_weights(problems or {}, names)
+
+def _header_problem_classes(header: dict) -> tuple[list[BaseProblem], list[float] | None]:
+    return [load_problem_class(name) for name in header["problem_classes"]], header.get("problem_weights")
+
+def get_problem(seed: int, index: int, max_problem_types: int | None = None, num_shots: int = 0, selected_problem_classes: list[BaseProblem] | None = None, example_pool: ExamplePool | None = None, problems: dict[str, float | None] | None = None, problem_weights: list[float] | None = None, config_options: dict | None = None) -> dict:
+    # Problem index of the benchmark generated with the same arguments, without generating the problems before it
+    if selected_problem_classes is None:
+        selected_problem_classes, problem_weights = select_problem_classes(max_problem_types, seed, problems)
+
+    problem_key, problem = generate_problem(_generation_config(seed, example_pool, config_options), seed, index, selected_problem_classes, num_shots, problem_weights)
+    return {"id": problem_key, **problem}
+
+def get_problem_from_file(path: str, index: int, example_pool_path: str | None = None) -> dict:
+    # Regenerates one problem of a .jsonl benchmark from the settings in its header
+    header = read_jsonl_header(path)
+    if header is None:
+        raise ValueError(f"'{path}' has no header")
+    return get_problem_from_header(header, index, example_pool_path, name=f"'{path}'")
+
+def get_problem_from_header(header: dict, index: int, example_pool_path: str | None = None, name: str = "The benchmark") -> dict:
+    if header.get("dedupe") is not None:
+        raise ValueError(f"{name} was deduplicated, so its problems depend on the ones before them and can't be regenerated one at a time")
+
+    # Any index gives a problem, but only those in the benchmark, or in the shard for a shard, are the benchmark's
+    indices = header_indices(header)
+    if index not in indices:
+        raise ValueError(f"{name} has problems {indices.start} to {indices.stop - 1}, not problem {index}")
+
+    selected_problem_classes, problem_weights = _header_problem_classes(header)
+    example_pool = None
+    if header.get("example_pool_size") is not None:
+        example_pool = ExamplePool(header["seed"], size=header["example_pool_size"], path=example_pool_path)
+
+    return get_problem(header["seed"], index, num_shots=header["num_shots"], selected_problem_classes=selected_problem_classes, example_pool=example_pool, problem_weights=problem_weights, config_options=_header_config_options(header))
+
+def generate_benchmark(seed: int | None = None, num_problems: int = 1000, max_problem_types: int = None, num_shots: int = 0, workers: int = 1, example_pool: ExamplePool | None = None, dedupe: str | None = None, problems: dict[str, float | None] | None = None, target_tokens: int | None = None, name_corpus: str | None = None) -> dict[str, dict]:
+    seed = Config(seed=seed).seed
+    selected_problem_classes, problem_weights = select_problem_classes(max_problem_types, seed, problems)
+    config_options = generation_options(selected_problem_classes, seed, num_shots, target_tokens, name_corpus)
+    problems: dict[str, ProblemRecord] = {}  # save_benchmark writes the records like the dicts they replace
+
+    generated = iter_problems(seed, range(num_problems), selected_problem_classes, num_shots, workers, example_pool, problem_weights, config_options=config_options)
+    deduplicator = PromptDeduplicator(dedupe, capacity=num_problems) if dedupe is not None else None
+    if deduplicator is not None:
+        generated = dedupe_problems(generated, deduplicator, seed, selected_problem_classes, num_shots, example_pool, problem_weights, config_options=config_options)
+
+    for problem_key, problem in tqdm(generated, total=num_problems):
+        problems[problem_key] = problem
+
+    if deduplicator is not None:
+        print_dedupe_report(deduplicator)
+
+    return {"seed": seed, "problems": problems}
 
 def save_benchmark(benchmark: dict, path: str) -> None:
     with open(path, 'w') as f:
-        json.dump(benchmark, f, indent=4)
+        json.dump(benchmark, f, indent=4, default=ProblemRecord.to_json)
+
+def write_benchmark(path: str, seed: int | None = None, num_problems: int = 1000, max_problem_types: int = None, num_shots: int = 0, workers: int = 1, resume: bool = False, example_pool_size: int | None = None, example_pool_path: str | None = None, profile: bool = False, dedupe: str | None = None, dedupe_error_rate: float = 0.001, problems: dict[str, float | None] | None = None, state_path: str | None = None, languages: list[str] | None = None, target_tokens: int | None = None, name_corpus: str | None = None, shard: tuple[int, int] | None = None) -> None:
+    # Writes each problem as soon as it is generated, so memory does not grow with num_problems.
+    # With profile, per stage timings and counters are written to path + ".profile.json".
+    # With dedupe, "exact" or "bloom", a problem whose prompt was generated before is regenerated with another seed.
+    # With state_path, the state of every problem is written to that .jsonl file, so benchmark.render can render the prompts again.
+    # With languages, there is one output per language, e.g. benchmark.de.jsonl. The problems are generated once in the
+    # first language and the others are rendered from their states, so every language has exactly the same problems.
+    # With target_tokens, every class is sized so its prompts are about that long, see benchmark.long_context.
+    # With shard (i, N), only the indices shard i owns are written, benchmark.merge joins the N outputs into the same
+    # benchmark a single run would write.
+    language = None
+    if languages:
+        language = languages[0]
+        if state_path is None:
+            state_path = os.path.splitext(split_compression(path)[0])[0] + ".state.jsonl"
+        output_paths = {output_language: language_path(path, output_language) for output_language in languages}
+        path = output_paths[language]
+    if state_path is not None and not is_jsonl(state_path):
+        raise ValueError("The state file must be a .jsonl file")
+    if resume and not is_jsonl(path):
+        raise ValueError("--resume requires a .jsonl output file")
+    if shard is not None:
+        if dedupe is not None:
+            raise ValueError("--dedupe can't be sharded, which problems are regenerated depends on every problem before them")
+        if not is_jsonl(path) and not is_dinos(path):
+            raise ValueError("--shard requires a .jsonl or .dinos output file, whose header records the shard for benchmark.merge")
+
+    existing_header = read_jsonl_header(path) if resume and os.path.exists(path) else None
+    if existing_header is not None:
+        seed = existing_header["seed"] if seed is None else seed
+        selected_problem_classes, problem_weights = _header_problem_classes(existing_header)
+    else:
+        seed = Config(seed=seed).seed
+        selected_problem_classes, problem_weights = select_problem_classes(max_problem_types, seed, problems)
+    config_options = generation_options(selected_problem_classes, seed, num_shots, target_tokens, name_corpus, language)
+
+    header = {
+        "seed": seed,
+        "num_problems": num_problems,
+        "num_shots": num_shots,
+        "problem_classes": [problem_class.__name__ for problem_class in selected_problem_classes],
+        "example_pool_size": example_pool_size
+    }
+    # Only added when set, so files written before they existed can still be resumed
+    if problem_weights is not None:
+        header["problem_weights"] = problem_weights
+    if dedupe is not None:
+        header["dedupe"] = dedupe
+    if "name_corpus" in config_options:
+        header["name_corpus"] = config_options["name_corpus"]
+    if target_tokens is not None:
+        header["target_tokens"] = target_tokens
+        header["problem_parameters"] = config_options["problem_parameters"]
+    if shard is not None:
+        header["shard"] = list(shard)
+    state_header = dict(header)  # States don't depend on the templates, only the rendered prompts do
+    if state_path is not None:
+        header["template_hashes"] = template_hashes(_generation_config(seed, config_options=config_options), selected_problem_classes)
+    if language is not None:
+        header["language"] = language
+
+    example_pool = None
+    if example_pool_size is not None:
+        example_pool = ExamplePool(seed, size=example_pool_size, path=example_pool_path)
+
+    if profile:
+        instrumentation.enable()
+    start_time = time.perf_counter()
+
+    with open_benchmark_writer(path, header, resume=resume) as writer, (open_benchmark_writer(state_path, state_header, resume=resume) if state_path is not None else contextlib.nullcontext()) as state_writer:
+        if state_writer is not None and state_writer.num_records != writer.num_records:
+            raise ValueError(f"Cannot resume: '{path}' has {writer.num_records} problems but '{state_path}' has {state_writer.num_records} states")
+        indices = shard_indices(num_problems, shard)
+        start = indices.start + writer.num_records
+        generated = iter_problems(seed, range(start, indices.stop), selected_problem_classes, num_shots, workers, example_pool, problem_weights, state_writer is not None, config_options)
+        deduplicator = None
+        if dedupe is not None:
+            deduplicator = PromptDeduplicator(dedupe, capacity=num_problems, error_rate=dedupe_error_rate)
+            if start:
+                records = iter_jsonl(path)
+                next(records)  # Header
+                for _, record in zip(range(start), records):
+                    deduplicator.add(record["prompt"])
+            generated = dedupe_problems(generated, deduplicator, seed, selected_problem_classes, num_shots, example_pool, problem_weights, state_writer is not None, config_options)
+
+        for problem_key, problem in tqdm(generated, initial=writer.num_records, total=len(indices)):
+            with instrumentation.stage("write", instrumentation.PIPELINE):
+                writer.write(problem_key, problem.to_json())
+                if state_writer is not None:
+                    state_writer.write(problem_key, problem.state)
+
+    if example_pool is not None and example_pool_path is not None:
+        example_pool.save(example_pool_path)
+
+    for output_language in (languages or [])[1:]:
+        with instrumentation.stage("render_" + output_language, instrumentation.PIPELINE):
+            render_benchmark(state_path, output_paths[output_language], workers=workers, language=output_language)
+
+    if deduplicator is not None:
+        print_dedupe_report(deduplicator)
+
+    if profile:
+        with open(path + ".profile.json", 'w') as f:
+            json.dump({
+                "header": header,
+                "workers": workers,
+                "num_problems": indices.stop - start,
+                "wall_seconds": time.perf_counter() - start_time,
+                "classes": instrumentation.get_profile().summary(),
+                "dedupe": deduplicator.report() if deduplicator is not None else None
+            }, f, indent=4)
+        instrumentation.disable()
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Generate a DINOS benchmark.")
     parser.add_argument('--seed', type=int, help='Seed for random number generator', default=None)
     parser.add_argument('--num_problems', type=int, help='Number of problems to generate', default=1000)
-    parser.add_argument('--output', type=str, help='Output file path', default='benchmark.json')
+    parser.add_argument('--output', type=str, help='Output file path. Use .jsonl for one problem per line, optionally with a .gz or .xz suffix, or .dinos for an indexed file with random access', default='benchmark.json')
+    parser.add_argument('--problems', type=str, help='Comma separated problem classes to draw from, each optionally with a relative weight, e.g. PeopleSortingResponseProblem:3,NavigateResponseProblem:1. Defaults to ' + ','.join(DEFAULT_PROBLEMS), default=None)
     parser.add_argument('--max_problem_types', type=int, help='Maximum number of types of problems to include', default=None)
     parser.add_argument('--num_shots', type=int, help='Number of example problems to include in the prompt', default=0)
+    parser.add_argument('--workers', type=int, help='Number of processes used to generate problems', default=1)
+    parser.add_argument('--resume', action='store_true', help='Continue a partially written .jsonl output file')
+    parser.add_argument('--example_pool_size', type=int, help='Pick few-shot examples from a shared pool of this many problems per problem configuration instead of generating new ones for every problem', default=None)
+    parser.add_argument('--example_pool', type=str, help='File to load the example pool from if it exists, and to save it to afterwards', default=None)
+    parser.add_argument('--profile', action='store_true', help='Write per stage timings and counters per problem class to <output>.profile.json')
+    parser.add_argument('--dedupe', type=str, choices=DEDUPE_MODES, help='Regenerate problems whose prompt was already generated, tracked by prompt hash in an exact set or in a Bloom filter of fixed size', default=None)
+    parser.add_argument('--dedupe_error_rate', type=float, help='False positive rate of the Bloom filter, sized for --num_problems prompts', default=0.001)
+    parser.add_argument('--state', type=str, help='Also write the state of every problem to this .jsonl file, so benchmark.render can render the prompts again after a template changes', default=None)
+    parser.add_argument('--languages', type=str, nargs='+', help='Write the same problems in each of these languages, to --output with the language inserted before the extension. Problems are generated once and rendered per language, which needs a --state file, by default next to the output', default=None)
+    parser.add_argument('--target_tokens', type=int, help='Size every problem class so its prompts are about this many tokens long, for long-context benchmarks. Classes without a size parameter, like the expression problems, or whose prompts cannot get that long are rejected', default=None)
+    parser.add_argument('--name_corpus', type=str, help='Name corpus people are drawn from, "default" or "synthetic" for generated names that never run out. Defaults to "synthetic" with --target_tokens', default=None)
+    parser.add_argument('--shard', type=str, help='Only generate the problems of shard i of N, given as i/N with i from 0, so N machines can each write one part. Join the parts with benchmark.merge', default=None)
+    parser.add_argument('--index', type=int, help='Print only this problem, read it from --output if it is an existing .dinos file, regenerate it with the settings from the header of an existing .jsonl --output, otherwise from the other arguments', default=None)
     
     args = parser.parse_args()
+    problems = parse_problems(args.problems) if args.problems is not None else None
+
+    if args.index is not None:
+        if is_dinos(args.output) and os.path.exists(args.output):
+            with DinosBenchmarkReader(args.output) as reader:
+                problem = reader[args.index]
+        elif args.dedupe is not None:
+            raise ValueError("--index can't regenerate one problem of a deduplicated benchmark, write it to a .dinos file and read it from there")
+        elif is_jsonl(args.output) and os.path.exists(args.output):
+            problem = get_problem_from_file(args.output, args.index, example_pool_path=args.example_pool)
+        elif args.seed is None:
+            raise ValueError("--index needs --seed or an existing .jsonl --output file")
+        else:
+            example_pool = ExamplePool(args.seed, size=args.example_pool_size, path=args.example_pool) if args.example_pool_size is not None else None
+            selected_problem_classes, problem_weights = select_problem_classes(args.max_problem_types, args.seed, problems)
+            config_options = generation_options(selected_problem_classes, args.seed, args.num_shots, args.target_tokens, args.name_corpus)
+            problem = get_problem(args.seed, args.index, num_shots=args.num_shots, selected_problem_classes=selected_problem_classes, example_pool=example_pool, problem_weights=problem_weights, config_options=config_options)
+        print(json.dumps(problem, indent=4))
+        return
 
-    benchmark = generate_benchmark(seed=args.seed, num_problems=args.num_problems, max_problem_types=args.max_problem_types, num_shots=args.num_shots)
-    save_benchmark(benchmark, args.output)
+    write_benchmark(args.output, seed=args.seed, num_problems=args.num_problems, max_problem_types=args.max_problem_types, num_shots=args.num_shots, workers=args.workers, resume=args.resume, example_pool_size=args.example_pool_size, example_pool_path=args.example_pool, profile=args.profile, dedupe=args.dedupe, dedupe_error_rate=args.dedupe_error_rate, problems=problems, state_path=args.state, languages=args.languages, target_tokens=args.target_tokens, name_corpus=args.name_corpus, shard=parse_shard(args.shard) if args.shard is not None else None)
 
 if __name__ == '__main__':
     main()
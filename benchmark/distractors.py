@@ -0,0 +1,208 @@
+from abc import ABC, abstractmethod
+from typing import Any
+
+from benchmark import instrumentation
+from benchmark.expressions import Expression, iter_paths, replace_operand
+from utils.problem_type import ProblemType
+
+
+class Choice:
+    # The two attributes multiple_choice_format.jinja reads from an option
+    __slots__ = ("problem", "_answer")
+
+    def __init__(self, problem: str, answer: Any) -> None:
+        self.problem = problem
+        self._answer = answer
+
+
+class DistractorStrategy(ABC):
+    # Proposes one wrong option at a time; returning None means this attempt failed
+    @abstractmethod
+    def propose(self, problem: "MultipleChoiceProblem") -> Choice | None:
+        raise NotImplementedError
+
+
+class RegenerateDistractor(DistractorStrategy):
+    # Generates a whole new response problem, used when there is nothing cheaper to perturb
+    def propose(self, problem: "MultipleChoiceProblem") -> Choice | None:
+        problem.config.increment_seed()
+        new_problem = problem.problems["response"](config=problem.config)
+        new_problem.problem_types = problem.problem_types  # Guarentees the correct type of problem is created
+        new_problem.generate(**vars(problem))
+
+        return new_problem
+
+
+class NumericNeighbourDistractor(DistractorStrategy):
+    def propose(self, problem: "MultipleChoiceProblem") -> Choice | None:
+        answer = int(problem._answer)
+        if problem.config.rng.random() < 0.2:
+            return Choice(problem.problem, str(-answer))  # Sign mistakes are a common error
+
+        spread = max(5, abs(answer) // 10)
+        return Choice(problem.problem, str(answer + problem.config.rng.choice([-1, 1]) * problem.config.rng.randint(1, spread)))
+
+
+class CoordinateOffsetDistractor(DistractorStrategy):
+    def propose(self, problem: "MultipleChoiceProblem") -> Choice | None:
+        x, y = problem.position
+        rng = problem.config.rng
+
+        mistake = rng.randint(0, 2)
+        if mistake == 0:
+            x, y = y, x
+        elif mistake == 1:
+            x, y = (-x, y) if rng.random() < 0.5 else (x, -y)
+        else:
+            x, y = x + rng.randint(-3, 3), y + rng.randint(-3, 3)
+
+        return Choice(problem.problem, f"({x}, {y})")
+
+
+class AdjacentSwapDistractor(DistractorStrategy):
+    def propose(self, problem: "MultipleChoiceProblem") -> Choice | None:
+        names = list(problem.sorted_names)
+        if len(names) < 2:
+            return None
+
+        i = problem.config.rng.randrange(len(names) - 1)
+        names[i], names[i + 1] = names[i + 1], names[i]
+        return Choice(problem.problem, " ".join(names))
+
+
+class PositionDistractor(DistractorStrategy):
+    def propose(self, problem: "MultipleChoiceProblem") -> Choice | None:
+        return Choice(problem.problem, problem.config.rng.randint(1, problem.num_people))
+
+
+class ClosingBracketDistractor(DistractorStrategy):
+    # Completions with one closing bracket of the wrong type, or two neighbouring ones swapped
+    def propose(self, problem: "MultipleChoiceProblem") -> Choice | None:
+        closers = [close for _, close in problem.parens]
+        answer = list(problem._answer)
+        rng = problem.config.rng
+
+        i = rng.randrange(len(answer))
+        if i + 1 < len(answer) and answer[i] != answer[i + 1] and rng.random() < 0.5:
+            answer[i], answer[i + 1] = answer[i + 1], answer[i]
+        else:
+            answer[i] = rng.choice([close for close in closers if close != answer[i]])
+
+        return Choice(problem.problem, "".join(answer))
+
+
+class OpeningBracketDistractor(DistractorStrategy):
+    # Changing the type of one opening bracket always breaks the word, whichever part holds its partner
+    def propose(self, problem: "MultipleChoiceProblem") -> Choice | None:
+        openers = [open for open, _ in problem.parens]
+        prefix = list(problem.problem)
+        rng = problem.config.rng
+
+        opener_indices = [i for i, char in enumerate(prefix) if char in openers]
+        if not opener_indices:
+            return None
+
+        i = rng.choice(opener_indices)
+        prefix[i] = rng.choice([open for open in openers if open != prefix[i]])
+        return Choice("".join(prefix), None)
+
+
+class ExpressionMutationDistractor(DistractorStrategy):
+    # Changes a literal or an operator, or drops a unary operator, once or twice, and only recomputes the values along
+    # the changed paths. Small boolean trees often hide a single change, so a second one widens the pool of options.
+    def propose(self, problem: "MultipleChoiceProblem") -> Choice | None:
+        rng = problem.config.rng
+        expression = problem.expression
+
+        for _ in range(1 + (rng.random() < 0.5)):
+            path, node = rng.choice(list(iter_paths(expression)))
+
+            if node.is_literal():
+                if isinstance(node.value, bool):
+                    replacement = Expression.literal(not node.value)
+                else:
+                    replacement = Expression.literal(rng.choice([value for value in range(problem.min_value, problem.max_value + 1) if value != node.value] or [node.value + 1]))
+            elif node.is_unary():
+                replacement = node.operands[0]
+            else:
+                operators = list(node.operators)
+                i = rng.randrange(len(operators))
+                operators[i] = rng.choice([other for other in problem.operators if other != operators[i]])
+                replacement = Expression.chain(list(node.operands), operators)
+
+            expression = replace_operand(expression, path, replacement)
+
+        if str(expression.value) == problem._answer:
+            return None  # Skip rendering options that would be rejected anyway
+        return Choice(problem.render_expression(expression), str(expression.value))
+
+
+class NavigateStepDistractor(DistractorStrategy):
+    # Changes the distance or direction of one move
+    def propose(self, problem: "MultipleChoiceProblem") -> Choice | None:
+        rng = problem.config.rng
+        move_indices = [i for i, action in enumerate(problem.actions) if action[0] == "move"]
+        if not move_indices:
+            return None
+
+        actions = list(problem.actions)
+        i = rng.choice(move_indices)
+        _, direction, steps = actions[i]
+        if problem.max_distance > problem.min_distance and rng.random() < 0.5:
+            steps = rng.choice([distance for distance in range(problem.min_distance, problem.max_distance + 1) if distance != steps])
+        else:
+            direction = rng.choice([other for other in problem.directions if other != direction])
+        actions[i] = ("move", direction, steps)
+
+        x, y = problem._walk(actions)
+        return Choice(problem._describe(actions), f"({x}, {y})")
+
+
+class LiarStatementDistractor(DistractorStrategy):
+    # Flipping any single statement flips the truthfulness of everyone after it, including the last person
+    def propose(self, problem: "MultipleChoiceProblem") -> Choice | None:
+        statements = list(problem.statements)
+        i = problem.config.rng.randrange(len(statements))
+        if statements[i].endswith(" tells the truth."):
+            statements[i] = statements[i].removesuffix(" tells the truth.") + " lies."
+        else:
+            statements[i] = statements[i].removesuffix(" lies.") + " tells the truth."
+
+        return Choice(" ".join(statements), str(problem._answer != "True"))
+
+
+def _display_key(option: Any, problem_types: list[ProblemType]) -> Any:
+    if ProblemType.CHOOSE_MATCHING_EXPRESSION in problem_types:
+        return option.problem
+    return option._answer
+
+def create_distractors(problem: "MultipleChoiceProblem", count: int, strategy: DistractorStrategy, attempts_per_distractor: int = 8) -> list[Choice]:
+    # Rejects candidates that look like an existing option or share the correct answer, with a bounded number of
+    # attempts per strategy before falling back to regenerating whole problems
+    seen = {_display_key(problem, problem.problem_types)}
+    distractors: list[Choice] = []
+
+    strategies = [strategy] if isinstance(strategy, RegenerateDistractor) else [strategy, RegenerateDistractor()]
+    for current_strategy in strategies:
+        for _ in range(attempts_per_distractor * count):
+            if len(distractors) == count:
+                return distractors
+
+            if current_strategy is not strategy:
+                instrumentation.count("distractor_regenerations")
+            candidate = current_strategy.propose(problem)
+            if candidate is None or candidate._answer == problem._answer:
+                instrumentation.count("distractor_rejections")
+                continue
+
+            key = _display_key(candidate, problem.problem_types)
+            if key not in seen:
+                seen.add(key)
+                distractors.append(candidate)
+            else:
+                instrumentation.count("distractor_rejections")
+
+    if len(distractors) < count:
+        raise ValueError(f"Could only generate {len(distractors)} of {count} distinct options for {problem.problem_name}")
+
+    return distractors
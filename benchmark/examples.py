@@ -0,0 +1,96 @@
+import hashlib
+import inspect
+import json
+import os
+
+from benchmark.config import Config
+
+
+class Example:
+    # The two attributes response_problem.jinja and multiple_choice_problem.jinja read from an example,
+    # and the example problem's state for rendering it again
+    __slots__ = ("prompt", "answer", "state")
+
+    def __init__(self, prompt: str, answer, state: dict | None = None) -> None:
+        self.prompt = prompt
+        self.answer = answer
+        self.state = state
+
+    def to_state(self) -> dict:
+        if self.state is None:
+            raise ValueError("This example was loaded from an example pool file without states, generate the pool again to save problem states")
+        return self.state
+
+
+class ExamplePool:
+    # Few-shot examples shared by every problem with the same class, problem types and generation parameters.
+    # Each pool is generated from its own seeds, so it is identical in every process that builds it.
+    def __init__(self, seed: int, size: int = 64, path: str | None = None) -> None:
+        self.seed: int = seed
+        self.size: int = size
+        self.pools: dict[str, list[Example]] = {}
+        self.new_keys: list[str] = []
+
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    @staticmethod
+    def key(problem: "BaseProblem") -> str:
+        generate_parameters = inspect.signature(type(problem).generate).parameters
+        parameters = {name: value for name, value in vars(problem).items() if name in generate_parameters and name != "self"}
+
+        return json.dumps([type(problem).__name__, [str(pt) for pt in problem.problem_types], parameters], sort_keys=True)
+
+    def _example_seed(self, key: str, index: int) -> int:
+        return int.from_bytes(hashlib.sha256(f"{self.seed}:{key}:{index}".encode()).digest()[:6], "big")
+
+    def get(self, problem: "BaseProblem") -> list[Example]:
+        key = self.key(problem)
+        pool = self.pools.get(key)
+        if pool is None:
+            pool = self.pools[key] = [self._generate_example(problem, key, i) for i in range(self.size)]
+            self.new_keys.append(key)
+
+        return pool
+
+    def _generate_example(self, problem: "BaseProblem", key: str, index: int) -> Example:
+        config = Config(seed=self._example_seed(key, index), template_dir=problem.config.template_dir, languages=problem.config.languages, fallback_language=problem.config.fallback_language, name_corpus=problem.config.name_corpus)
+        example_problem = type(problem)(config=config)
+        example_problem.problem_types = list(problem.problem_types)  # Guarentees the correct type of problem is created
+        example_problem.generate(**vars(problem))
+        example_problem.generate_prompt(num_shots=0)
+
+        return Example(example_problem.prompt, example_problem.answer, example_problem.to_state())
+
+    def select(self, problem: "BaseProblem", num_shots: int) -> list[Example]:
+        if num_shots > self.size:
+            raise ValueError(f"num_shots ({num_shots}) can't be larger than the example pool size ({self.size})")
+
+        return problem.config.rng.sample(self.get(problem), num_shots)
+
+    def take_new_pools(self) -> dict[str, list[Example]]:
+        # Pools built since the last call, so worker processes can hand them back to the parent
+        new_pools = {key: self.pools[key] for key in self.new_keys}
+        self.new_keys = []
+        return new_pools
+
+    def add_pools(self, pools: dict[str, list[Example]]) -> None:
+        for key, pool in pools.items():
+            self.pools.setdefault(key, pool)
+
+    def save(self, path: str) -> None:
+        with open(path, 'w') as f:
+            json.dump({
+                "seed": self.seed,
+                "size": self.size,
+                "pools": {key: [[example.prompt, example.answer, example.state] for example in pool] for key, pool in self.pools.items()}
+            }, f)
+
+    def load(self, path: str) -> None:
+        with open(path) as f:
+            data = json.load(f)
+
+        # A pool of another seed or size holds other examples, using it would change the problems
+        if data["seed"] != self.seed or data["size"] != self.size:
+            raise ValueError(f"Example pool '{path}' was generated with seed {data['seed']} and size {data['size']}, not seed {self.seed} and size {self.size}")
+        self.pools.update({key: [Example(*example) for example in pool] for key, pool in data["pools"].items()})
@@ -0,0 +1,154 @@
+import operator
+from typing import Any, Callable, Iterable
+
+
+# Operator: (precedence, function), matching Python's precedence rules
+BINARY_OPERATORS: dict[str, tuple[int, Callable[[Any, Any], Any]]] = {
+    "or": (1, lambda left, right: left or right),
+    "and": (2, lambda left, right: left and right),
+    "+": (3, operator.add),
+    "-": (3, operator.sub),
+    "*": (4, operator.mul)
+}
+UNARY_OPERATORS: dict[str, Callable[[Any], Any]] = {
+    "not": operator.not_
+}
+
+
+class Expression:
+    # A literal has no operands, a unary operation has one operator and one operand,
+    # and a chain has one operator fewer than operands, e.g. (a + b * c)
+    __slots__ = ("value", "operators", "operands")
+
+    def __init__(self, value: Any, operators: tuple[str, ...] = (), operands: tuple["Expression", ...] = ()) -> None:
+        self.value: Any = value
+        self.operators: tuple[str, ...] = operators
+        self.operands: tuple["Expression", ...] = operands
+
+    @classmethod
+    def literal(cls, value: Any) -> "Expression":
+        return cls(value)
+
+    @classmethod
+    def unary(cls, unary_operator: str, operand: "Expression") -> "Expression":
+        return cls(UNARY_OPERATORS[unary_operator](operand.value), (unary_operator,), (operand,))
+
+    @classmethod
+    def chain(cls, operands: list["Expression"], operators: list[str]) -> "Expression":
+        if len(operands) != len(operators) + 1:
+            raise ValueError("A chain needs exactly one more operand than operators")
+        return cls(_evaluate_chain([operand.value for operand in operands], operators), tuple(operators), tuple(operands))
+
+    def is_literal(self) -> bool:
+        return not self.operands
+
+    def is_unary(self) -> bool:
+        return len(self.operands) == 1
+
+    def size(self) -> int:
+        size = 0
+        stack = [self]
+        while stack:
+            expression = stack.pop()
+            size += 1
+            stack.extend(expression.operands)
+        return size
+
+
+def _evaluate_chain(values: list[Any], operators: Iterable[str]) -> Any:
+    # Operator precedence parsing over an already tokenized chain, left associative
+    output = [values[0]]
+    pending: list[str] = []
+
+    def reduce() -> None:
+        right = output.pop()
+        left = output.pop()
+        output.append(BINARY_OPERATORS[pending.pop()][1](left, right))
+
+    for binary_operator, value in zip(operators, values[1:]):
+        precedence = BINARY_OPERATORS[binary_operator][0]
+        while pending and BINARY_OPERATORS[pending[-1]][0] >= precedence:
+            reduce()
+        pending.append(binary_operator)
+        output.append(value)
+
+    while pending:
+        reduce()
+
+    return output[0]
+
+def evaluate_many(expressions: Iterable[Expression]) -> list[Any]:
+    # Recomputes every value from the literals up, without recursion
+    results: list[Any] = []
+    stack: list[tuple[Expression, bool]] = [(expression, False) for expression in reversed(list(expressions))]
+
+    while stack:
+        expression, children_done = stack.pop()
+        if expression.is_literal():
+            results.append(expression.value)
+        elif not children_done:
+            stack.append((expression, True))
+            stack.extend((operand, False) for operand in reversed(expression.operands))
+        else:
+            values = results[-len(expression.operands):]
+            del results[-len(expression.operands):]
+            if expression.is_unary():
+                results.append(UNARY_OPERATORS[expression.operators[0]](values[0]))
+            else:
+                results.append(_evaluate_chain(values, expression.operators))
+
+    return results
+
+def evaluate(expression: Expression) -> Any:
+    return evaluate_many([expression])[0]
+
+def render(expression: Expression, parenthesize_operands: bool = False) -> str:
+    # Chains are wrapped as a whole, e.g. (1 + 2), unless parenthesize_operands, e.g. (True) and (False)
+    parts: list[str] = []
+    stack: list[Expression | str] = [expression]
+
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            parts.append(item)
+        elif item.is_literal():
+            parts.append(str(item.value))
+        elif item.is_unary():
+            stack.extend((")", item.operands[0], f"{item.operators[0]} ("))
+        else:
+            separator = ") {} (" if parenthesize_operands else " {} "
+            tokens: list[Expression | str] = ["(", item.operands[0]]
+            for binary_operator, operand in zip(item.operators, item.operands[1:]):
+                tokens.append(separator.format(binary_operator))
+                tokens.append(operand)
+            tokens.append(")")
+            stack.extend(reversed(tokens))
+
+    return "".join(parts)
+
+def iter_paths(expression: Expression) -> Iterable[tuple[tuple[int, ...], Expression]]:
+    # Every node in pre-order, with the operand indices leading to it from the root
+    stack: list[tuple[tuple[int, ...], Expression]] = [((), expression)]
+    while stack:
+        path, node = stack.pop()
+        yield path, node
+        stack.extend((path + (i,), operand) for i, operand in reversed(list(enumerate(node.operands))))
+
+def replace_operand(expression: Expression, path: Iterable[int], replacement: Expression) -> Expression:
+    # Returns a new tree sharing every subtree that is not on the path, with values recomputed along it
+    nodes: list[Expression] = []
+    node = expression
+    path = tuple(path)
+    for index in path:
+        nodes.append(node)
+        node = node.operands[index]
+
+    for node, index in zip(reversed(nodes), reversed(path)):
+        operands = list(node.operands)
+        operands[index] = replacement
+        if node.is_unary():
+            replacement = Expression.unary(node.operators[0], operands[0])
+        else:
+            replacement = Expression.chain(operands, list(node.operators))
+
+    return replacement
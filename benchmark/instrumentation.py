@@ -0,0 +1,103 @@
+import contextlib
+import time
+
+
+PIPELINE: str = "pipeline"  # Key for work that doesn't belong to one problem class, e.g. writing the output
+
+
+class Profile:
+    # Wall time per stage and event counters, grouped by the class of the problem being generated.
+    # Stages nest, e.g. render also runs inside examples and generate_prompt, so their times overlap.
+    def __init__(self) -> None:
+        self.classes: dict[str, dict] = {}
+        self.current: str = PIPELINE
+
+    def _entry(self, key: str) -> dict:
+        entry = self.classes.get(key)
+        if entry is None:
+            entry = self.classes[key] = {"stages": {}, "counters": {}}
+        return entry
+
+    def add_time(self, stage: str, seconds: float, key: str | None = None) -> None:
+        stages = self._entry(key or self.current)["stages"]
+        totals = stages.get(stage)
+        if totals is None:
+            totals = stages[stage] = {"calls": 0, "seconds": 0.0}
+        totals["calls"] += 1
+        totals["seconds"] += seconds
+
+    def count(self, counter: str, n: int = 1, key: str | None = None) -> None:
+        counters = self._entry(key or self.current)["counters"]
+        counters[counter] = counters.get(counter, 0) + n
+
+    def take(self) -> dict[str, dict]:
+        # Hands over everything recorded so far, so worker processes can send their share to the parent
+        classes, self.classes = self.classes, {}
+        return classes
+
+    def merge(self, classes: dict[str, dict]) -> None:
+        for key, entry in classes.items():
+            for stage, totals in entry["stages"].items():
+                merged = self._entry(key)["stages"].setdefault(stage, {"calls": 0, "seconds": 0.0})
+                merged["calls"] += totals["calls"]
+                merged["seconds"] += totals["seconds"]
+            for counter, n in entry["counters"].items():
+                self.count(counter, n, key)
+
+    def summary(self) -> dict:
+        summary = {}
+        for key, entry in sorted(self.classes.items()):
+            problems = entry["counters"].get("problems", 0)
+            stages = {}
+            for stage, totals in sorted(entry["stages"].items(), key=lambda item: -item[1]["seconds"]):
+                stages[stage] = dict(totals, ms_per_problem=1000 * totals["seconds"] / problems if problems else None)
+            summary[key] = {"stages": stages, "counters": dict(sorted(entry["counters"].items()))}
+        return summary
+
+
+class _Stage:
+    __slots__ = ("profile", "name", "key", "start")
+
+    def __init__(self, profile: Profile, name: str, key: str | None) -> None:
+        self.profile = profile
+        self.name = name
+        self.key = key
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *args) -> None:
+        self.profile.add_time(self.name, time.perf_counter() - self.start, self.key)
+
+
+_profile: Profile | None = None
+_NULL_STAGE = contextlib.nullcontext()
+
+
+# Everything below is a single global check while profiling is off
+def stage(name: str, key: str | None = None) -> contextlib.AbstractContextManager:
+    if _profile is None:
+        return _NULL_STAGE
+    return _Stage(_profile, name, key)
+
+def count(counter: str, n: int = 1) -> None:
+    if _profile is not None:
+        _profile.count(counter, n)
+
+def begin_problem(problem_class_name: str) -> None:
+    if _profile is not None:
+        _profile.current = problem_class_name
+        _profile.count("problems")
+
+def enable() -> Profile:
+    global _profile
+    if _profile is None:
+        _profile = Profile()
+    return _profile
+
+def disable() -> None:
+    global _profile
+    _profile = None
+
+def get_profile() -> Profile | None:
+    return _profile
@@ -0,0 +1,70 @@
+import re
+
+from benchmark.config import Config
+from benchmark.problems.problem import BaseProblem
+
+
+# Words split into pieces of up to 4 characters and every other symbol counts on its own, which lands within about 20%
+# of BPE tokenizers on the prompts here and needs no tokenizer or network access
+_TOKEN_PIECES: re.Pattern = re.compile(r"\w+|[^\w\s]")
+PROBE_SAMPLES: int = 5  # Problems measured per size, prompts of one size vary with the names and statements drawn
+MAX_PROBES: int = 12
+MAX_SHORTFALL: float = 0.2  # A class whose prompts stay further below the target at its max_size is rejected
+
+
+def estimate_tokens(text: str) -> int:
+    return sum((len(piece) + 3) // 4 for piece in _TOKEN_PIECES.findall(text))
+
+def measure_prompt_tokens(problem_class: BaseProblem, size: int, num_shots: int = 0, seed: int = 0, config_options: dict | None = None) -> float:
+    # Mean estimated tokens of PROBE_SAMPLES prompts of this size, generated from fixed seeds so the result is reproducible
+    total = 0
+    for i in range(PROBE_SAMPLES):
+        problem = problem_class(config=Config(seed=seed + i, **(config_options or {})))
+        problem.generate(**problem_class.size_parameters(size))
+        problem.generate_prompt(num_shots=num_shots)
+        total += estimate_tokens(problem.prompt)
+    return total / PROBE_SAMPLES
+
+def fit_problem_size(problem_class: BaseProblem, target_tokens: int, num_shots: int = 0, seed: int = 0, config_options: dict | None = None) -> int:
+    # Size whose prompts come closest to target_tokens. Prompt length grows about linearly with size, so the secant
+    # method gets there in a handful of probes even for prompts of hundreds of thousands of tokens.
+    # A class with a max_size whose prompts at that size are still well short of the target is rejected, like a class
+    # without a size parameter, instead of silently making a benchmark with shorter prompts than asked for.
+    if problem_class.size_parameters(problem_class.min_size) is None:
+        raise ValueError(f"{problem_class.__name__} has no size parameter, so its prompt length can't be targeted")
+
+    measured: dict[int, float] = {}
+
+    def measure(size: int) -> float:
+        if size not in measured:
+            measured[size] = measure_prompt_tokens(problem_class, size, num_shots, seed, config_options)
+        return measured[size]
+
+    def clamp(size: int) -> int:
+        size = max(problem_class.min_size, size)
+        return size if problem_class.max_size is None else min(problem_class.max_size, size)
+
+    low = problem_class.min_size
+    high = clamp(max(low + 1, round(low * target_tokens / measure(low))))
+    for _ in range(MAX_PROBES):
+        low_tokens, high_tokens = measure(low), measure(high)
+        if high_tokens == low_tokens:
+            break
+        # At most 8 times larger per step, in case the smallest sizes are dominated by the fixed part of the prompt
+        size = clamp(min(high * 8, round(high + (target_tokens - high_tokens) * (high - low) / (high_tokens - low_tokens))))
+        if size in measured:
+            break
+        low, high = high, size
+
+    best = min(measured, key=lambda size: (abs(measured[size] - target_tokens), size))
+    if best == problem_class.max_size and measured[best] < target_tokens * (1 - MAX_SHORTFALL):
+        raise ValueError(f"{problem_class.__name__} prompts are only about {round(measured[best])} tokens long at its largest size, {problem_class.max_size}, short of the {target_tokens} tokens targeted. Leave it out with --problems or lower --target_tokens")
+
+    return best
+
+def fit_problem_parameters(selected_problem_classes: list[BaseProblem], target_tokens: int, num_shots: int = 0, seed: int = 0, config_options: dict | None = None) -> dict[str, dict]:
+    # Arguments to generate per class name for Config.problem_parameters, so every class aims at the same prompt length
+    if target_tokens < 1:
+        raise ValueError("target_tokens must be >= 1")
+
+    return {problem_class.__name__: problem_class.size_parameters(fit_problem_size(problem_class, target_tokens, num_shots, seed, config_options)) for problem_class in selected_problem_classes}
@@ -0,0 +1,88 @@
+import argparse
+import json
+
+from tqdm import tqdm
+
+from benchmark.dinos import get_problem_from_header, shard_indices
+from benchmark.render import read_benchmark_header
+from benchmark.scoring import iter_benchmark
+from benchmark.storage import open_benchmark_writer
+
+
+def read_shard_headers(shard_paths: list[str]) -> tuple[dict, list[str]]:
+    # Checks the shards were generated with the same settings and that every shard is there exactly once.
+    # Returns the header of the whole benchmark and the shard paths in shard order.
+    shards: dict[int, str] = {}
+    header = None
+    num_shards = None
+    for path in shard_paths:
+        shard_header = read_benchmark_header(path)
+        if shard_header is None or "shard" not in shard_header:
+            raise ValueError(f"'{path}' has no shard in its header, write each shard with benchmark.dinos --shard to a .jsonl or .dinos file")
+
+        (shard_index, shard_count), shard_header = shard_header["shard"], {key: value for key, value in shard_header.items() if key != "shard"}
+        if header is None:
+            header, num_shards = shard_header, shard_count
+        elif shard_header != header or shard_count != num_shards:
+            raise ValueError(f"'{path}' wasn't generated with the same settings as '{shard_paths[0]}'")
+        if shard_index in shards:
+            raise ValueError(f"'{path}' and '{shards[shard_index]}' are both shard {shard_index}")
+        shards[shard_index] = path
+
+    if header is None:
+        raise ValueError("No shards given")
+    missing = [str(shard_index) for shard_index in range(num_shards) if shard_index not in shards]
+    if missing:
+        raise ValueError(f"Missing shards {', '.join(missing)} of {num_shards}")
+
+    return header, [shards[shard_index] for shard_index in range(num_shards)]
+
+def merge_shards(shard_paths: list[str], output_path: str, num_verify: int = 0, example_pool_path: str | None = None) -> int:
+    # Writes the problems of all shards in index order with the header a single run would have written, so the output
+    # is the same file as generating the benchmark in one go. Every shard must hold exactly the indices it owns.
+    # With num_verify, that many problems spread over the benchmark are regenerated and compared. Returns the number of problems.
+    header, shard_paths = read_shard_headers(shard_paths)
+    num_shards = len(shard_paths)
+    verify_indices = {header["num_problems"] * i // num_verify for i in range(num_verify)} if num_verify > 0 else set()
+
+    with open_benchmark_writer(output_path, header) as writer, tqdm(total=header["num_problems"]) as progress:
+        for shard_index, path in enumerate(shard_paths):
+            indices = shard_indices(header["num_problems"], (shard_index, num_shards))
+            problems = iter_benchmark(path)
+            for index in indices:
+                problem_id, problem = next(problems, (None, None))
+                if problem_id is None:
+                    raise ValueError(f"'{path}' ends before problem {index}, shard {shard_index} owns problems {indices.start} to {indices.stop - 1}")
+                if problem_id != str(index):
+                    raise ValueError(f"'{path}' has problem {problem_id} where shard {shard_index} should have problem {index}")
+                problem.pop("id", None)
+
+                if index in verify_indices:
+                    expected = json.loads(json.dumps(get_problem_from_header(header, index, example_pool_path)))
+                    expected.pop("id")
+                    if expected != problem:
+                        raise ValueError(f"Problem {index} in '{path}' differs from the problem its settings generate")
+
+                writer.write(problem_id, problem)
+                progress.update()
+
+            extra_id, _ = next(problems, (None, None))
+            if extra_id is not None:
+                raise ValueError(f"'{path}' has problem {extra_id} after the last problem of shard {shard_index}, {indices.stop - 1}")
+
+    return header["num_problems"]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Merge the shards of a benchmark written by benchmark.dinos --shard into one benchmark.")
+    parser.add_argument('shards', type=str, nargs='+', help='Shard files written by benchmark.dinos --shard, in any order')
+    parser.add_argument('--output', type=str, help='Benchmark file to write, .json for the {"seed", "problems"} layout, .jsonl or .dinos', required=True)
+    parser.add_argument('--verify', type=int, help='Regenerate this many problems spread over the benchmark and check they match the shards', default=0)
+    parser.add_argument('--example_pool', type=str, help='Example pool file the shards were generated with, to verify problems without generating the pool again', default=None)
+
+    args = parser.parse_args()
+
+    num_problems = merge_shards(args.shards, args.output, num_verify=args.verify, example_pool_path=args.example_pool)
+    print(f"Merged {len(args.shards)} shards, {num_problems} problems")
+
+if __name__ == '__main__':
+    main()
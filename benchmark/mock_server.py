@@ -0,0 +1,80 @@
+import argparse
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmark.scoring import iter_benchmark
+
+
+class MockModelHandler(BaseHTTPRequestHandler):
+    # Answers /chat/completions and /completions like an OpenAI-compatible server, for testing the runner locally
+    protocol_version = "HTTP/1.1"  # Keep-alive, like a real inference server
+    wbufsize = -1  # Headers and body go out in one write, delayed ACKs would otherwise add ~40ms to every response
+    disable_nagle_algorithm = True
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def _send_json(self, status: int, data: dict) -> None:
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _respond(self, prompt: str) -> str:
+        return str(self.server.answers.get(prompt, self.server.default_response))
+
+    def do_POST(self) -> None:
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        time.sleep(self.server.latency)
+
+        if self.server.failure_rate and self.server.rng.random() < self.server.failure_rate:
+            self._send_json(503, {"error": {"message": "Simulated overload"}})
+            return
+
+        if self.path.endswith("/chat/completions"):
+            content = self._respond(payload["messages"][-1]["content"])
+            choices = [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}]
+        elif self.path.endswith("/completions"):
+            prompts = payload["prompt"] if isinstance(payload["prompt"], list) else [payload["prompt"]]
+            choices = [{"index": i, "text": self._respond(prompt), "finish_reason": "stop"} for i, prompt in enumerate(prompts)]
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        self._send_json(200, {"object": "chat.completion" if "messages" in payload else "text_completion", "model": payload.get("model"), "choices": choices})
+
+
+def create_server(host: str = "127.0.0.1", port: int = 8000, benchmark_path: str | None = None, default_response: str = "A", latency: float = 0.0, failure_rate: float = 0.0, seed: int | None = None) -> ThreadingHTTPServer:
+    # With a benchmark, prompts from it are answered correctly, anything else gets default_response
+    server = ThreadingHTTPServer((host, port), MockModelHandler)
+    server.daemon_threads = True
+    server.answers = {problem["prompt"]: problem["answer"] for _, problem in iter_benchmark(benchmark_path)} if benchmark_path else {}
+    server.default_response = default_response
+    server.latency = latency
+    server.failure_rate = failure_rate
+    server.rng = random.Random(seed)
+
+    return server
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a local stand-in for an OpenAI-compatible model server.")
+    parser.add_argument('--host', type=str, help='Host to listen on', default='127.0.0.1')
+    parser.add_argument('--port', type=int, help='Port to listen on', default=8000)
+    parser.add_argument('--benchmark', type=str, help='Benchmark file whose prompts are answered correctly', default=None)
+    parser.add_argument('--default_response', type=str, help='Response to prompts that are not in the benchmark', default='A')
+    parser.add_argument('--latency', type=float, help='Seconds to wait before each response', default=0.0)
+    parser.add_argument('--failure_rate', type=float, help='Fraction of requests answered with HTTP 503', default=0.0)
+    parser.add_argument('--seed', type=int, help='Seed for simulated failures', default=None)
+
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, args.benchmark, args.default_response, args.latency, args.failure_rate, args.seed)
+    print(f"Serving on http://{args.host}:{server.server_address[1]}/v1")
+    server.serve_forever()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+import argparse
+import itertools
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from benchmark.config import Config
+from benchmark.problems.problem import BaseProblem, MultipleChoiceProblem
+from benchmark.registry import available_problems, load_problem_class
+
+
+# Generation parameters swept per problem name, each value is one case
+GENERATE_PARAMETERS: dict[str, list[dict]] = {
+    "boolean_expression_problem": [{"min_depth": depth, "max_depth": depth} for depth in (2, 4, 6)],
+    "dyck_language_problem": [{"min_length": length, "max_length": length} for length in (5, 20, 80)],
+    "liar_problem": [{"num_people": num_people} for num_people in (5, 20)],
+    "logical_deduction_n_people_problem": [{"num_people": num_people} for num_people in (4, 6, 8)],
+    "math_expression_problem": [{"min_depth": depth, "max_depth": depth} for depth in (2, 3, 4)],
+    "navigate_problem": [{"min_num_steps": num_steps, "max_num_steps": num_steps} for num_steps in (5, 20)],
+    "people_sorting_problem": [{"num_names": num_names} for num_names in (5, 15, 50)]
+}
+NUM_SHOTS: list[int] = [0, 3]
+NUM_OPTIONS: list[int] = [4, 8]
+
+
+def iter_cases(selected_problem_classes: list[BaseProblem], quick: bool = False) -> list[dict]:
+    cases = []
+    for problem_class in selected_problem_classes:
+        problem_name = problem_class(config=Config(seed=0)).problem_name
+        generate_parameters = GENERATE_PARAMETERS.get(problem_name, [{}])
+        prompt_parameters = [{"num_shots": num_shots} for num_shots in NUM_SHOTS]
+        if issubclass(problem_class, MultipleChoiceProblem):
+            prompt_parameters = [{"num_shots": num_shots, "num_options": num_options} for num_shots, num_options in itertools.product(NUM_SHOTS, NUM_OPTIONS)]
+        if quick:
+            generate_parameters, prompt_parameters = generate_parameters[:1], prompt_parameters[:1]
+
+        for generate_kwargs, prompt_kwargs in itertools.product(generate_parameters, prompt_parameters):
+            cases.append({"problem_class": problem_class, "generate": generate_kwargs, "prompt": prompt_kwargs})
+
+    return cases
+
+def _generate(problem_class: BaseProblem, config: Config, seed: int, generate_kwargs: dict, prompt_kwargs: dict) -> None:
+    config.set_seed(seed)
+    problem = problem_class(config=config)
+    problem.generate(**generate_kwargs)
+    problem.generate_prompt(**prompt_kwargs)
+    json.dumps(problem.generate_problem_json(0)["0"])  # The record dinos.py writes
+
+def run_case(case: dict, min_time: float = 1.0, max_problems: int = 100000, memory_problems: int = 50, seed: int = 0) -> dict:
+    # Throughput is measured without tracemalloc, which slows allocation down several times.
+    # Some parameter combinations can't always be generated, e.g. 8 distinct options for a tiny expression, so
+    # failures are counted rather than stopping the suite.
+    config = Config(seed=seed)
+    problem_class, generate_kwargs, prompt_kwargs = case["problem_class"], case["generate"], case["prompt"]
+
+    def attempt(problem_seed: int) -> bool:
+        try:
+            _generate(problem_class, config, problem_seed, generate_kwargs, prompt_kwargs)
+            return True
+        except ValueError:
+            return False
+
+    attempt(seed)  # Warm up templates and name corpora
+
+    num_problems = 0
+    failures = 0
+    start = time.perf_counter()
+    while num_problems < max_problems and (num_problems == 0 or time.perf_counter() - start < min_time):
+        failures += not attempt(seed + num_problems * 1000000)
+        num_problems += 1
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    for i in range(memory_problems):
+        attempt(seed + i * 1000000)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "problem_class": problem_class.__name__,
+        "generate": generate_kwargs,
+        "prompt": prompt_kwargs,
+        "num_problems": num_problems,
+        "failures": failures,
+        "problems_per_second": (num_problems - failures) / elapsed,
+        "peak_memory_bytes": peak_memory
+    }
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _case_key(result: dict) -> str:
+    return json.dumps([result["problem_class"], result["generate"], result["prompt"]], sort_keys=True)
+
+def compare(baseline: dict, current: dict, threshold: float = 0.8) -> list[str]:
+    # Cases whose throughput fell below threshold times the baseline
+    baseline_results = {_case_key(result): result for result in baseline["results"]}
+    regressions = []
+
+    for result in current["results"]:
+        previous = baseline_results.get(_case_key(result))
+        if previous is None:
+            continue
+
+        ratio = result["problems_per_second"] / max(1e-9, previous["problems_per_second"])
+        memory_ratio = result["peak_memory_bytes"] / max(1, previous["peak_memory_bytes"])
+        line = f"{result['problem_class']} {json.dumps(result['generate'])} {json.dumps(result['prompt'])}: {ratio:.2f}x speed, {memory_ratio:.2f}x memory"
+        print(line)
+        if ratio < threshold:
+            regressions.append(line)
+
+    return regressions
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure problem generation throughput and peak memory per problem class.")
+    parser.add_argument('--output', type=str, help='JSON file to write the results to', default='perf.json')
+    parser.add_argument('--classes', type=str, nargs='+', help='Only measure these problem classes, every registered class by default', default=None)
+    parser.add_argument('--quick', action='store_true', help='Only the first parameter case of each class, for a fast check of every class')
+    parser.add_argument('--min_time', type=float, help='Seconds to spend on each case', default=1.0)
+    parser.add_argument('--compare', type=str, help='Earlier results to compare against, exits with 1 on a regression', default=None)
+    parser.add_argument('--threshold', type=float, help='Slowest acceptable fraction of the baseline throughput', default=0.8)
+
+    args = parser.parse_args()
+
+    # Every class by default, so a --compare run catches a regression in any generator
+    names = args.classes or sorted(available_problems())
+    selected_problem_classes = [load_problem_class(name) for name in names]
+
+    results = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": []
+    }
+    for case in iter_cases(selected_problem_classes, quick=args.quick):
+        result = run_case(case, min_time=args.min_time)
+        print(f"{result['problem_class']} {json.dumps(result['generate'])} {json.dumps(result['prompt'])}: {result['problems_per_second']:.0f} problems/s, {result['peak_memory_bytes'] / 1024:.0f} KiB peak, {result['failures']} failures")
+        results["results"].append(result)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=4)
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, threshold=args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) below {args.threshold:.2f}x of the baseline:")
+            for line in regressions:
+                print(line)
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
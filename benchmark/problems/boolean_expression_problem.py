@@ -1,3 +1,5 @@
+from benchmark.distractors import ExpressionMutationDistractor
+from benchmark.expressions import Expression, render
 from benchmark.problems.problem import BaseProblem, ResponseProblem, MultipleChoiceProblem
 from utils.problem_type import ProblemType
 
@@ -7,7 +9,7 @@ class BooleanExpressionProblem(BaseProblem):
         self.problem_name: str = "boolean_expression_problem"
         super().__init__(**kwargs)
 
-        self.bool_values: list[str] = ["True", "False"]
+        self.bool_values: list[bool] = [True, False]
         self.operators: list[str] = ["and", "or"]
         self.unary_operator: str = "not"
 
@@ -16,36 +18,75 @@ class BooleanExpressionProblem(BaseProblem):
             "multiple_choice": BooleanExpressionMultipleChoiceProblem
         }
 
-    def generate(self, min_depth: int = 3, max_depth: int = 4, **kwargs) -> None:
+    def generate(self, min_depth: int = 3, max_depth: int = 4, max_nodes: int | None = None, **kwargs) -> None:
         if not isinstance(min_depth, int) or not isinstance(max_depth, int):
             raise ValueError("min_depth and max_depth must be integers")
         if min_depth < 1 or max_depth < min_depth:
             raise ValueError("min_depth must be >= 1 and max_depth must be >= min_depth")
+        if max_nodes is not None and max_nodes < max_depth:
+            raise ValueError("max_nodes must be >= max_depth, since an expression of depth n has at least n nodes")
 
         self.min_depth: int = min_depth
         self.max_depth: int = max_depth
+        self.max_nodes: int | None = max_nodes
         self.depth: int = self.config.rng.randint(min_depth, max_depth)
 
-        def generate_expression(depth: int) -> str:
+        if max_nodes is not None:
+            self.expression: Expression = self._generate_budgeted_expression(self.depth, max_nodes)
+            self.problem: str = self.render_expression(self.expression)
+            self._answer: str = str(self.expression.value)
+            self.answer: str = self._answer
+            return
+
+        def generate_expression(depth: int) -> Expression:
             if depth == 1:
-                return self.config.rng.choice(self.bool_values)
+                return Expression.literal(self.config.rng.choice(self.bool_values))
             else:
                 sub_expr1 = generate_expression(depth - 1)
                 sub_expr2 = generate_expression(depth - 1)
 
                 # Randomly choose to use a unary operator or a binary operator
                 if self.config.rng.random() < 0.5:
-                    return f"{self.unary_operator} ({sub_expr1})"
+                    return Expression.unary(self.unary_operator, sub_expr1)
                 else:
                     operator = self.config.rng.choice(self.operators)
-                    return f"({sub_expr1}) {operator} ({sub_expr2})"
+                    return Expression.chain([sub_expr1, sub_expr2], [operator])
 
-        self.problem: str = generate_expression(self.depth)
-        self._answer: str = self._evaluate(self.problem)
+        self.expression: Expression = generate_expression(self.depth)
+        self.problem: str = self.render_expression(self.expression)
+        self._answer: str = str(self.expression.value)
         self.answer: str = self._answer
 
-    def _evaluate(self, expression: str) -> str:
-        return str(eval(expression))
+    def render_expression(self, expression: Expression) -> str:
+        return render(expression, parenthesize_operands=True)
+
+    def _generate_budgeted_expression(self, depth: int, max_nodes: int) -> Expression:
+        # Only builds the subtrees that end up in the expression, and never more than max_nodes nodes.
+        # Frames are either (depth, node budget) to expand or (operator, arity) to assemble from finished operands.
+        operands: list[Expression] = []
+        stack: list[tuple] = [(depth, max_nodes)]
+
+        while stack:
+            frame = stack.pop()
+            if isinstance(frame[0], str):
+                operator, arity = frame
+                sub_exprs = operands[-arity:]
+                del operands[-arity:]
+                operands.append(Expression.unary(operator, sub_exprs[0]) if arity == 1 else Expression.chain(sub_exprs, [operator]))
+                continue
+
+            depth, budget = frame
+            if depth == 1:
+                operands.append(Expression.literal(self.config.rng.choice(self.bool_values)))
+            # A subtree of depth n needs at least n nodes, so a binary operator is only possible if both sides fit
+            elif budget - 1 >= 2 * (depth - 1) and self.config.rng.random() >= 0.5:
+                operator = self.config.rng.choice(self.operators)
+                left_budget = (budget - 1) // 2
+                stack.extend(((operator, 2), (depth - 1, budget - 1 - left_budget), (depth - 1, left_budget)))
+            else:
+                stack.extend(((self.unary_operator, 1), (depth - 1, budget - 1)))
+
+        return operands[0]
 
 
 class BooleanExpressionResponseProblem(BooleanExpressionProblem, ResponseProblem):
@@ -53,5 +94,9 @@ class BooleanExpressionResponseProblem(BooleanExpressionProblem, ResponseProblem
 
 
 class BooleanExpressionMultipleChoiceProblem(BooleanExpressionProblem, MultipleChoiceProblem):
+    distractor_strategies = {
+        ProblemType.CHOOSE_MATCHING_EXPRESSION: ExpressionMutationDistractor()
+    }
+
     def generate_prompt(self, **kwargs) -> None:
         super().generate_prompt(ProblemType.CHOOSE_MATCHING_EXPRESSION, **kwargs)
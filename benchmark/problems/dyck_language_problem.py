@@ -1,8 +1,59 @@
+import random
+
+from benchmark.distractors import ClosingBracketDistractor, OpeningBracketDistractor
 from benchmark.problems.problem import BaseProblem, ResponseProblem, MultipleChoiceProblem
 from utils.problem_type import ProblemType
 
 
+def generate_dyck_word(rng: random.Random, num_pairs: int, parens: list[tuple[str, str]]) -> tuple[str, int]:
+    # Each pair encloses a random split of the remaining pairs into the words inside it and after it, which are generated
+    # first and then the pair's brackets are picked. An explicit stack walks the pairs in that order, so the rng is
+    # used exactly as by the recursive definition and the same seed gives the same word, while each bracket is written
+    # straight to its position in a preallocated buffer.
+    # randint(0, n - 1) and choice() draw through the same rejection sampling over getrandbits as inlined here.
+    # Also returns the index after the last opening bracket, the earliest point the word can be split for the answer.
+    getrandbits = rng.getrandbits
+    opening = [ord(paren[0]) for paren in parens]
+    closing = [ord(paren[1]) for paren in parens]
+    num_parens = len(parens)
+    paren_bits = num_parens.bit_length()
+
+    word = bytearray(2 * num_pairs)
+    last_opening = -1
+    # (pairs, start) for a word to generate, (-1 - pairs, start) to pick the brackets of the pair enclosing it.
+    # Empty words draw nothing, so they are never pushed.
+    stack = [(num_pairs, 0)] if num_pairs else []
+    push, pop = stack.append, stack.pop
+    while stack:
+        pairs, start = pop()
+        if pairs > 0:
+            bits = pairs.bit_length()
+            split = getrandbits(bits)
+            while split >= pairs:
+                split = getrandbits(bits)
+
+            push((-1 - pairs, start))
+            if split < pairs - 1:
+                push((pairs - split - 1, start + 1 + 2 * split))
+            if split:
+                push((split, start + 1))
+            if start > last_opening:
+                last_opening = start
+        else:
+            paren = getrandbits(paren_bits)
+            while paren >= num_parens:
+                paren = getrandbits(paren_bits)
+
+            word[start] = opening[paren]
+            word[start - 2 * pairs - 3] = closing[paren]
+
+    split_index = last_opening + 1 if last_opening != -1 else len(word) // 2
+    return word.decode("ascii"), split_index
+
+
 class DyckLanguageProblem(BaseProblem):
+    min_size: int = 2
+
     def __init__(self, **kwargs) -> None:
         self.problem_name: str = "dyck_language_problem"
         super().__init__(**kwargs)
@@ -19,38 +70,28 @@ class DyckLanguageProblem(BaseProblem):
         self.max_length: int = max_length
         self.length: int = self.config.rng.randint(min_length, max_length)
 
-        def generate_dyck_word(length: int) -> str:
-            if length == 0:
-                return ""
-            else:
-                split = self.config.rng.randint(0, length - 1)
-                left = generate_dyck_word(split)
-                right = generate_dyck_word(length - split - 1)
-                paren = self.config.rng.choice(self.parens)
-                return f"{paren[0]}{left}{right}{paren[1]}"
-        
-        def valid_split_index(dyck_word: str) -> int:
-            last_start_index = -1
-            for i, char in enumerate(dyck_word):
-                if char in "([{<":
-                    last_start_index = i
-            return last_start_index + 1 if last_start_index != -1 else len(dyck_word) // 2
-
-        dyck_word = generate_dyck_word(self.length // 2 * 2)  # Ensure even length
-
-        split_index = valid_split_index(dyck_word)
+        dyck_word, split_index = generate_dyck_word(self.config.rng, self.length // 2 * 2, self.parens)  # Ensure even length
         random_split_index = self.config.rng.randint(split_index, len(dyck_word) - 1)
 
         self.problem = dyck_word[:random_split_index]
         self._answer = dyck_word[random_split_index:]
         self.answer: str = self._answer
 
+    @classmethod
+    def size_parameters(cls, size: int) -> dict:
+        return {"min_length": size, "max_length": size}
+
 
 class DyckLanguageResponseProblem(DyckLanguageProblem, ResponseProblem):
     pass
 
 
 class DyckLanguageMultipleChoiceProblem(DyckLanguageProblem, MultipleChoiceProblem):
+    distractor_strategies = {
+        ProblemType.SOLVE_EXPRESSION: ClosingBracketDistractor(),
+        ProblemType.CHOOSE_MATCHING_EXPRESSION: OpeningBracketDistractor()
+    }
+
     def generate_prompt(self, **kwargs) -> None:
         if ProblemType.SOLVE_EXPRESSION not in self.problem_types and ProblemType.CHOOSE_MATCHING_EXPRESSION not in self.problem_types:
             if self.config.rng.choice([True, False]):
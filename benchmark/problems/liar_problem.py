@@ -1,16 +1,17 @@
-import json
-
+from benchmark.distractors import LiarStatementDistractor
 from benchmark.problems.problem import BaseProblem, ResponseProblem, MultipleChoiceProblem
+from utils.names import get_name_corpus
 from utils.problem_type import ProblemType
 
 
 class LiarProblem(BaseProblem):
+    min_size: int = 2
+
     def __init__(self, **kwargs) -> None:
         self.problem_name: str = "liar_problem"
         super().__init__(**kwargs)
 
-        with open("utils/names.json") as f:
-            self.names: list[str] = json.load(f)["names"]
+        self.names: tuple[str, ...] = get_name_corpus(self.config.name_corpus).names
 
         self.truthfulness: dict[str, bool] = {}
         self.statements: list[str] = []
@@ -56,19 +57,27 @@ class LiarProblem(BaseProblem):
                         self.statements.append(f"{previous_name} says {current_name} lies.")
                 else:
                     if self.truthfulness[current_name]:
-                        self.statements.append(f"{previous_name} says {current_name} tells the truth.")
-                    else:
                         self.statements.append(f"{previous_name} says {current_name} lies.")
+                    else:
+                        self.statements.append(f"{previous_name} says {current_name} tells the truth.")
 
         self.problem: str = " ".join(self.statements)
         self._answer = str(self.truthfulness[self.names[-1]])
         self.answer: str = self._answer
 
+    @classmethod
+    def size_parameters(cls, size: int) -> dict:
+        return {"num_people": size}
+
 
 class LiarResponseProblem(LiarProblem, ResponseProblem):
     pass
 
 
 class LiarMultipleChoiceProblem(LiarProblem, MultipleChoiceProblem):
+    distractor_strategies = {
+        ProblemType.CHOOSE_MATCHING_EXPRESSION: LiarStatementDistractor()
+    }
+
     def generate_prompt(self, **kwargs) -> None:
         super().generate_prompt(ProblemType.CHOOSE_MATCHING_EXPRESSION, **kwargs)
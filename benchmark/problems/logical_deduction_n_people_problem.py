@@ -1,18 +1,20 @@
-import json
-import warnings
-from itertools import permutations
-
+from benchmark import instrumentation
+from benchmark.distractors import Choice, PositionDistractor
 from benchmark.problems.problem import BaseProblem, ResponseProblem, MultipleChoiceProblem
+from utils.names import get_name_corpus
 from utils.problem_type import ProblemType
 
 
 class LogicalDeductionNPeopleProblem(BaseProblem):
+    min_size: int = 3
+    max_size: int = 200  # The solver slows down quickly beyond this, 200 people is about 2000 tokens
+    template_attributes = ("problem", "_answer", "unmentioned_person")
+
     def __init__(self, **kwargs) -> None:
         self.problem_name: str = "logical_deduction_n_people_problem"
         super().__init__(**kwargs)
 
-        with open("utils/names.json") as f:
-            self.names: list[str] = json.load(f)["names"]
+        self.names: tuple[str, ...] = get_name_corpus(self.config.name_corpus).names
 
         self.problems: dict[str, BaseProblem] = {
             "response": LogicalDeductionNPeopleResponseProblem,
@@ -22,185 +24,158 @@ class LogicalDeductionNPeopleProblem(BaseProblem):
 
         self.unmentioned_person: str = ""
 
-    def generate(self, num_people: int = 5, **kwargs) -> None:
-        if num_people > 7:
-            warnings.warn("This uses a factorial algorithm, so it may take a long time to generate for large num_people.")
-
+    def generate(self, num_people: int = 5, max_repairs_per_person: int = 4, **kwargs) -> None:
         self.num_people = num_people
         self.names = self.config.rng.sample(self.names, num_people)
 
         self.unmentioned_person = self.config.rng.choice(self.names)
 
+        # Constraints use the index of each person in self.names, which is also their position
+        statement_choices: dict[int, list[tuple[str, tuple]]] = {}
         for index, person in enumerate(self.names):
             if person == self.unmentioned_person:
                 continue
 
-            statement_choices: list[str] = []
+            choices: list[tuple[str, tuple]] = []
 
             if index == 0:
-                statement_choices.append(f"{person} is the leftmost person.")
+                choices.append((f"{person} is the leftmost person.", ("position", index, 0)))
             if index == self.num_people - 1:
-                statement_choices.append(f"{person} is the rightmost person.")
+                choices.append((f"{person} is the rightmost person.", ("position", index, index)))
 
             if index != 0:
-                statement_choices.append(f"{person} is to the right of {self.names[index - 1]}.")
+                choices.append((f"{person} is to the right of {self.names[index - 1]}.", ("order", index - 1, index)))
             if index != self.num_people - 1:
-                statement_choices.append(f"{person} is to the left of {self.names[index + 1]}.")
+                choices.append((f"{person} is to the left of {self.names[index + 1]}.", ("order", index, index + 1)))
             if 0 < index < self.num_people - 1:
-                statement_choices.append(f"{person} is between {self.names[index - 1]} and {self.names[index + 1]}.")
+                choices.append((f"{person} is between {self.names[index - 1]} and {self.names[index + 1]}.", ("between", index - 1, index, index + 1)))
 
                 left_position = index + 1
                 right_position = self.num_people - index
 
-                statement_choices.append(f"{person} is {left_position} positions from the left.")
-                statement_choices.append(f"{person} is {right_position} positions from the right.")
+                choices.append((f"{person} is {left_position} positions from the left.", ("position", index, index)))
+                choices.append((f"{person} is {right_position} positions from the right.", ("position", index, index)))
+
+            statement_choices[index] = choices
+
+        chosen: dict[int, tuple[str, tuple]] = {index: self.config.rng.choice(choices) for index, choices in statement_choices.items()}
 
-            self.statements.append(self.config.rng.choice(statement_choices))
+        # Instead of starting over, redraw the statement of someone who can be placed in two valid arrangements
+        for _ in range(max_repairs_per_person * num_people + 1):
+            self.statements = [statement for statement, _ in chosen.values()]
+            self.constraints: list[tuple] = [constraint for _, constraint in chosen.values()]
 
-        if not self._evaluate():
+            arrangements = self._evaluate()
+            if len(arrangements) == 1:
+                break
+
+            instrumentation.count("repairs")
+            ambiguous_people = [index for index in chosen if arrangements[0][index] != arrangements[1][index]]
+            index = self.config.rng.choice(ambiguous_people)
+            chosen[index] = self.config.rng.choice([choice for choice in statement_choices[index] if choice != chosen[index]])
+        else:
+            instrumentation.count("restarts")
             self.config.increment_seed()
             self.__init__(**vars(self))
-            self.generate(num_people=num_people)
+            self.generate(num_people=num_people, max_repairs_per_person=max_repairs_per_person)
             return
 
         self.problem: str = " ".join(self.config.rng.sample(self.statements, len(self.statements)))
         self._answer: str = self.names.index(self.unmentioned_person) + 1  # The unmentioned person's position
         self.answer: str = self._answer
 
-    def _evaluate(self) -> bool:
-        remaining_people: set = set(self.names)
-
-        guarenteed_people_order = ["?" for _ in range(self.num_people)]
-
-        for constraint in self.statements:
-            if " is the leftmost person." in constraint:
-                person = constraint.split(" is the leftmost person.")[0]
-                remaining_people.remove(person)
-                guarenteed_people_order[0] = person
-            elif " is the rightmost person." in constraint:
-                person = constraint.split(" is the rightmost person.")[0]
-                remaining_people.remove(person)
-                guarenteed_people_order[-1] = person
-            elif " positions from the left." in constraint:
-                parts = constraint.split(" is ")
-                person = parts[0]
-                position = int(parts[1].split(" positions from the left.")[0])
-                guarenteed_people_order[position - 1] = person
-                remaining_people.remove(person)
-            elif " positions from the right." in constraint:
-                parts = constraint.split(" is ")
-                person = parts[0]
-                position = int(parts[1].split(" positions from the right.")[0])
-                guarenteed_people_order[-position] = person
-                remaining_people.remove(person)
-
-            if len(remaining_people) == 1:
-                return True
-
-        # Second round of checking for constraints that can be inferred 
-        updated = True
-        while updated:
-            updated = False
-            for constraint in self.statements:
-                if " is to the left of " in constraint:
-                    left_person = constraint.split(" is to the left of ")[0]
-                    right_person = constraint.split(" is to the left of ")[1].split(".")[0]
-                    
-                    if not left_person in guarenteed_people_order or not right_person in guarenteed_people_order:
-                        continue
-                    elif left_person in guarenteed_people_order and not right_person in guarenteed_people_order:
-                        remaining_people.remove(right_person)
-                        guarenteed_people_order[guarenteed_people_order.index(left_person) + 1] = right_person
-                        updated = True
-                    elif not left_person in guarenteed_people_order and right_person in guarenteed_people_order:
-                        remaining_people.remove(left_person)
-                        guarenteed_people_order[guarenteed_people_order.index(right_person) - 1] = left_person
-                        updated = True
-                elif " is to the right of " in constraint:
-                    right_person = constraint.split(" is to the right of ")[0]
-                    left_person = constraint.split(" is to the right of ")[1].split(".")[0]
-                    
-                    if not left_person in guarenteed_people_order or not right_person in guarenteed_people_order:
-                        continue
-                    elif left_person in guarenteed_people_order and not right_person in guarenteed_people_order:
-                        remaining_people.remove(right_person)
-                        guarenteed_people_order[guarenteed_people_order.index(left_person) - 1] = right_person
-                        updated = True
-                    elif not left_person in guarenteed_people_order and right_person in guarenteed_people_order:
-                        remaining_people.remove(left_person)
-                        guarenteed_people_order[guarenteed_people_order.index(right_person) + 1] = left_person
-                        updated = True
-                elif " is between " in constraint:
-                    left_person = constraint.split(" is between ")[0]
-                    right_person = constraint.split(" is between ")[1].split(" and ")[1].split(".")[0]
-                    middle_person = constraint.split(" is between ")[1].split(" and ")[0]
-                    
-                    if not left_person in guarenteed_people_order or not right_person in guarenteed_people_order or not middle_person in guarenteed_people_order:
-                        continue
-                    elif left_person in guarenteed_people_order and not right_person in guarenteed_people_order:
-                        remaining_people.remove(right_person)
-                        guarenteed_people_order[guarenteed_people_order.index(left_person) + 1] = right_person
-                        updated = True
-                    elif not left_person in guarenteed_people_order and right_person in guarenteed_people_order:
-                        remaining_people.remove(left_person)
-                        guarenteed_people_order[guarenteed_people_order.index(right_person) - 1] = left_person
-                        updated = True
-                    elif left_person in guarenteed_people_order and not middle_person in guarenteed_people_order:
-                        remaining_people.remove(middle_person)
-                        guarenteed_people_order[guarenteed_people_order.index(left_person) + 1] = middle_person
-                        updated = True
-                    elif not left_person in guarenteed_people_order and middle_person in guarenteed_people_order:
-                        remaining_people.remove(left_person)
-                        guarenteed_people_order[guarenteed_people_order.index(middle_person) - 1] = left_person
-                        updated = True
-                    elif middle_person in guarenteed_people_order and not right_person in guarenteed_people_order:
-                        remaining_people.remove(right_person)
-                        guarenteed_people_order[guarenteed_people_order.index(middle_person) + 1] = right_person
-                        updated = True
-                    elif not middle_person in guarenteed_people_order and right_person in guarenteed_people_order:
-                        remaining_people.remove(middle_person)
-                        guarenteed_people_order[guarenteed_people_order.index(right_person) - 1] = middle_person
-                        updated = True
-
-        all_possible_orders = self._get_all_permutations(guarenteed_people_order, remaining_people)
-        for order in all_possible_orders:
-            if order == guarenteed_people_order:
+    @classmethod
+    def size_parameters(cls, size: int) -> dict:
+        return {"num_people": size}
+
+    def _evaluate(self, limit: int = 2) -> list[list[int]]:
+        # Returns up to limit arrangements (position of each person) that satisfy every constraint
+        return solve_arrangements(self.num_people, self.constraints, limit)
+
+
+def solve_arrangements(num_people: int, constraints: list[tuple], limit: int = 2) -> list[list[int]]:
+    fixed_person: list[int | None] = [None] * num_people
+    fixed_position: list[int | None] = [None] * num_people
+    predecessors: list[int] = [0] * num_people  # Bitmask of the people that must be somewhere to the left
+
+    for constraint in constraints:
+        if constraint[0] == "position":
+            _, person, position = constraint
+            if fixed_position[person] not in (None, position) or fixed_person[position] not in (None, person):
+                return []
+            fixed_person[position] = person
+            fixed_position[person] = position
+        elif constraint[0] == "order":
+            _, left, right = constraint
+            predecessors[right] |= 1 << left
+        elif constraint[0] == "between":
+            _, left, middle, right = constraint
+            predecessors[middle] |= 1 << left
+            predecessors[right] |= 1 << middle
+        else:
+            raise ValueError(f"Unknown constraint {constraint}")
+
+    successors: list[list[int]] = [[] for _ in range(num_people)]
+    for person in range(num_people):
+        for other in range(num_people):
+            if predecessors[person] >> other & 1:
+                successors[other].append(person)
+
+    # Narrow the range of positions each person can take until nothing changes
+    lowest = [0 if position is None else position for position in fixed_position]
+    highest = [num_people - 1 if position is None else position for position in fixed_position]
+    updated = True
+    while updated:
+        updated = False
+        for person in range(num_people):
+            for other in successors[person]:
+                if lowest[other] < lowest[person] + 1:
+                    lowest[other] = lowest[person] + 1
+                    updated = True
+                if highest[person] > highest[other] - 1:
+                    highest[person] = highest[other] - 1
+                    updated = True
+            if lowest[person] > highest[person]:
+                return []  # Also catches cyclic constraints
+
+    # People that must already be placed once a position has been filled
+    overdue: list[int] = [0] * num_people
+    for person in range(num_people):
+        for position in range(highest[person], num_people):
+            overdue[position] |= 1 << person
+
+    arrangements: list[list[int]] = []
+    positions: list[int] = [0] * num_people
+    dead_ends: set[int] = set()
+
+    def place(position: int, placed: int) -> None:
+        if position == num_people:
+            arrangements.append(positions[:])
+            return
+        if placed in dead_ends:
+            return
+
+        found = len(arrangements)
+        if fixed_person[position] is not None:
+            candidates = [fixed_person[position]]
+        else:
+            candidates = [person for person in range(num_people) if fixed_position[person] is None and not placed >> person & 1 and lowest[person] <= position]
+
+        for person in candidates:
+            now_placed = placed | 1 << person
+            if predecessors[person] & ~placed or overdue[position] & ~now_placed:
                 continue
-            if self._is_valid_permutation(order):
-                return False
-        return True
-
-    def _get_all_permutations(self, guarenteed_people_order, remaining_people):
-        # Replaces '?' with remaining names in all possible permutations
-        question_mark_indices = [i for i, x in enumerate(guarenteed_people_order) if x == "?"]
-        all_permutations = []
-        for perm in permutations(remaining_people):
-            temp_order = list(guarenteed_people_order)
-            for idx, person in zip(question_mark_indices, perm):
-                temp_order[idx] = person
-            all_permutations.append(temp_order)
-        return all_permutations
-
-    def _is_valid_permutation(self, permutation):
-        for constraint in self.statements:
-            if " is to the left of " in constraint:
-                left_person = constraint.split(" is to the left of ")[0]
-                right_person = constraint.split(" is to the left of ")[1].split(".")[0]
-                if permutation.index(left_person) > permutation.index(right_person):
-                    return False
-            elif " is to the right of " in constraint:
-                right_person = constraint.split(" is to the right of ")[0]
-                left_person = constraint.split(" is to the right of ")[1].split(".")[0]
-                if permutation.index(left_person) > permutation.index(right_person):
-                    return False
-            elif " is between " in constraint:
-                left_person = constraint.split(" is between ")[0]
-                right_person = constraint.split(" is between ")[1].split(" and ")[1].split(".")[0]
-                middle_person = constraint.split(" is between ")[1].split(" and ")[0]
-                if permutation.index(left_person) > permutation.index(middle_person) or \
-                        permutation.index(middle_person) > permutation.index(right_person):
-                    return False
-        return True
+
+            positions[person] = position
+            place(position + 1, now_placed)
+            if len(arrangements) >= limit:
+                return
+
+        if len(arrangements) == found:
+            dead_ends.add(placed)
+
+    place(0, 0)
+    return arrangements
 
 
 class LogicalDeductionNPeopleResponseProblem(LogicalDeductionNPeopleProblem, ResponseProblem):
@@ -208,36 +183,19 @@ class LogicalDeductionNPeopleResponseProblem(LogicalDeductionNPeopleProblem, Res
 
 
 class LogicalDeductionNPeopleMultipleChoiceProblem(LogicalDeductionNPeopleProblem, MultipleChoiceProblem):
+    min_size: int = 4  # One position per option
+    distractor_strategies = {
+        ProblemType.SOLVE_EXPRESSION: PositionDistractor()
+    }
+
     def generate_prompt(self, **kwargs) -> None:
         super().generate_prompt(ProblemType.SOLVE_EXPRESSION, **kwargs)
 
-    def _create_additional_choices(self, option_labels: list[str], num_options: int) -> tuple[list[tuple[str, ResponseProblem]], str, int]:
+    def _create_additional_choices(self, option_labels: list[str], num_options: int) -> tuple[list[tuple[str, ResponseProblem | Choice]], str]:
         if num_options > self.num_people:
             raise ValueError("Number of options can't be greater than or equal to num_people.")
-    
-        option_pairs: list[tuple[str, ResponseProblem]] = [(label, None) for label in option_labels]
-
-        # Set the correct answer to this problem to a random label
-        random_label = self.config.rng.choice([label for label, option in option_pairs if option is None])
-        for i, (label, option) in enumerate(option_pairs):
-            if label == random_label:
-                option_pairs[i] = (label, self)
-                correct_label = label
-                break
-        
-        used_answers = [self._answer]
-        problems = []
-        while len(problems) < num_options:
-            new_problem = self.__class__(**self.__dict__)
-            new_problem._answer = self.config.rng.choice([i for i in range(1, self.num_people + 1) if i not in used_answers])
-            used_answers.append(new_problem._answer)
-            problems.append(new_problem)
-
-        for i, (label, option) in enumerate(option_pairs):
-            if option is None and problems:
-                option_pairs[i] = (label, problems.pop(0))
-
-        return option_pairs, correct_label
+
+        return super()._create_additional_choices(option_labels, num_options)
 
     def generate_problem_json(self, problem_id: int | None = None) -> dict:
         problem_json = super().generate_problem_json(problem_id)
@@ -1,3 +1,5 @@
+from benchmark.distractors import ExpressionMutationDistractor, NumericNeighbourDistractor
+from benchmark.expressions import Expression, render
 from benchmark.problems.problem import BaseProblem, ResponseProblem, MultipleChoiceProblem
 from utils.problem_type import ProblemType
 
@@ -15,18 +17,14 @@ class MathExpressionProblem(BaseProblem):
         }
 
     def generate(self, min_depth: int = 2, max_depth: int = 3, min_value: int = -9, max_value: int = 9, min_sub_expressions: int = 2, max_sub_expressions: int = 4, **kwargs) -> None:
-        def generate_expression(depth: int, num_sub_expressions: int = 2) -> str:
+        def generate_expression(depth: int, num_sub_expressions: int = 2) -> Expression:
             if depth == 1:
-                return str(self.config.rng.randint(min_value, max_value))
+                return Expression.literal(self.config.rng.randint(min_value, max_value))
             else:
                 sub_expressions = [generate_expression(depth - 1, self.config.rng.randint(min_sub_expressions, max_sub_expressions)) for _ in range(num_sub_expressions)]
                 generated_operators = [self.config.rng.choice(self.operators) for _ in range(num_sub_expressions - 1)]
-                
-                expression = sub_expressions[0]
-                for i in range(num_sub_expressions - 1):
-                    expression += f" {generated_operators[i]} {sub_expressions[i + 1]}"
-                
-                return f"({expression})"
+
+                return Expression.chain(sub_expressions, generated_operators)
 
         self.min_depth: int = min_depth
         self.max_depth: int = max_depth
@@ -38,16 +36,26 @@ class MathExpressionProblem(BaseProblem):
         depth: int = self.config.rng.randint(min_depth, max_depth)
         num_sub_expressions: int = self.config.rng.randint(min_sub_expressions, max_sub_expressions)
         
-        self.problem = generate_expression(depth, num_sub_expressions)
-        self._answer = str(eval(self.problem))
+        # The value is computed while the tree is built, so the text never has to be parsed
+        self.expression: Expression = generate_expression(depth, num_sub_expressions)
+        self.problem = self.render_expression(self.expression)
+        self._answer = str(self.expression.value)
         self.answer: str = self._answer
 
+    def render_expression(self, expression: Expression) -> str:
+        return render(expression)
+
 
 class MathExpressionResponseProblem(MathExpressionProblem, ResponseProblem):
     pass
 
 
 class MathExpressionMultipleChoiceProblem(MathExpressionProblem, MultipleChoiceProblem):
+    distractor_strategies = {
+        ProblemType.SOLVE_EXPRESSION: NumericNeighbourDistractor(),
+        ProblemType.CHOOSE_MATCHING_EXPRESSION: ExpressionMutationDistractor()
+    }
+
     def generate_prompt(self, **kwargs) -> None:
         if ProblemType.SOLVE_EXPRESSION not in self.problem_types and ProblemType.CHOOSE_MATCHING_EXPRESSION not in self.problem_types:
             if self.config.rng.choice([True, False]):
@@ -1,8 +1,12 @@
+from benchmark.distractors import CoordinateOffsetDistractor, NavigateStepDistractor
 from benchmark.problems.problem import BaseProblem, ResponseProblem, MultipleChoiceProblem
 from utils.problem_type import ProblemType
+from utils.rng import MT_N, python_random_words
 
 
 class NavigateProblem(BaseProblem):
+    min_size: int = 1
+
     def __init__(self, **kwargs) -> None:
         self.problem_name: str = "navigate_problem"
         super().__init__(**kwargs)
@@ -12,28 +16,154 @@ class NavigateProblem(BaseProblem):
             "multiple_choice": NavigateMultipleChoiceProblem
         }
 
-    def generate(self, min_num_steps: int = 5, max_num_steps: int = 7, min_distance: int = 1, max_distance: int = 10, **kwargs) -> None:
-        directions = ["forward", "left", "right", "backward"]
+    def generate(self, min_num_steps: int = 5, max_num_steps: int = 7, min_distance: int = 1, max_distance: int = 10, draws: dict | None = None, **kwargs) -> None:
+        self.directions: list[str] = ["forward", "left", "right", "backward"]
         turns = ["left", "right", "around"]
-        actions = []
 
         self.min_num_steps: int = min_num_steps
         self.max_num_steps: int = max_num_steps
-        self.num_steps = self.config.rng.randint(min_num_steps, max_num_steps)
         self.min_distance: int = min_distance
         self.max_distance: int = max_distance
 
-        x, y = 0, 0  # Starting position
-        facing = 0  # 0: North, 1: East, 2: South, 3: West
+        if draws is not None and draws["seed"] == self.config.seed:
+            # Drawn by generate_batch from this problem's freshly seeded rng, skipping the words it used leaves the rng
+            # where the loop below would have left it
+            self.config.rng.getrandbits(32 * draws["num_words"])
+            self.num_steps = len(draws["actions"])
+            self.actions: list[tuple] = draws["actions"]
+            self.position: tuple[int, int] = draws["position"]
+            self.problem: str = draws["problem"]
+            self._answer: str = f"({self.position[0]}, {self.position[1]})"
+            self.answer: str = self._answer
+            return
+
+        self.num_steps = self.config.rng.randint(min_num_steps, max_num_steps)
 
+        # ("move", direction, steps) or ("turn", turn)
+        self.actions: list[tuple] = []
         for _ in range(self.num_steps):
             action_type = self.config.rng.choice(["move", "turn"])
 
             if action_type == "move":
-                direction = self.config.rng.choice(directions)
+                direction = self.config.rng.choice(self.directions)
                 steps = self.config.rng.randint(min_distance, max_distance)
-                action = f"Take {steps} step{'s' if steps > 1 else ''} {direction}."
-                actions.append(action)
+                self.actions.append(("move", direction, steps))
+            else:
+                self.actions.append(("turn", self.config.rng.choice(turns)))
+
+        self.position: tuple[int, int] = self._walk(self.actions)
+        self.problem: str = self._describe(self.actions)
+        self._answer: str = f"({self.position[0]}, {self.position[1]})"
+        self.answer: str = self._answer
+
+    @classmethod
+    def size_parameters(cls, size: int) -> dict:
+        return {"min_num_steps": size, "max_num_steps": size}
+
+    @classmethod
+    def generate_batch(cls, seeds: list[int], min_num_steps: int = 5, max_num_steps: int = 7, min_distance: int = 1, max_distance: int = 10, **kwargs) -> list[dict | None]:
+        # The walks generate would draw from random.Random(seed) for each seed, computed for all seeds at once with numpy.
+        # Each rng's raw 32 bit words are taken in one call and random's rejection sampling is replayed on them as arrays,
+        # so the walks are exactly the scalar ones. Pass an item as draws to generate of a problem whose config was just
+        # seeded with that seed. None marks the rare walk that needs more words than were taken, generate draws it itself.
+        try:
+            import numpy as np
+        except ImportError as e:
+            raise ImportError("generate_batch requires numpy, install it with 'pip install DINOS[batch]'") from e
+
+        directions = ["forward", "left", "right", "backward"]
+        turns = ["left", "right", "around"]
+        n = len(seeds)
+        num_words = min(MT_N, 16 + 8 * max_num_steps)  # A step takes about 4 words on average
+        words = python_random_words(seeds, num_words).ravel()
+        row_starts = np.arange(n, dtype=np.int64) * num_words
+        used = np.zeros(n, dtype=np.int64)
+        exhausted = np.zeros(n, dtype=bool)
+
+        def randbelow(m: int, active) -> "np.ndarray":
+            # random's _randbelow(m): take the top m.bit_length() bits of the next word until they are below m
+            shift = np.uint32(32 - m.bit_length())
+            result = np.zeros(n, dtype=np.int64)
+            pending = np.flatnonzero(active & ~exhausted)
+            while pending.size:
+                position = used[pending]
+                out_of_words = position >= num_words
+                if out_of_words.any():
+                    exhausted[pending[out_of_words]] = True
+                    pending, position = pending[~out_of_words], position[~out_of_words]
+                values = words[row_starts[pending] + position] >> shift
+                used[pending] = position + 1
+                accepted = values < m
+                result[pending[accepted]] = values[accepted]
+                pending = pending[~accepted]
+            return result
+
+        everyone = np.ones(n, dtype=bool)
+        num_steps = min_num_steps + randbelow(max_num_steps - min_num_steps + 1, everyone)
+        is_move = np.zeros((n, max_num_steps), dtype=bool)
+        direction = np.zeros((n, max_num_steps), dtype=np.int64)
+        steps = np.zeros((n, max_num_steps), dtype=np.int64)
+        turn = np.zeros((n, max_num_steps), dtype=np.int64)
+        for step in range(max_num_steps):
+            active = step < num_steps
+            is_move[:, step] = active & (randbelow(2, active) == 0)
+            direction[:, step] = randbelow(len(directions), is_move[:, step])
+            steps[:, step] = min_distance + randbelow(max_distance - min_distance + 1, is_move[:, step])
+            turn[:, step] = randbelow(len(turns), active & ~is_move[:, step])
+
+        # Heading before each action is the sum of the earlier turns mod 4, 0: North, 1: East, 2: South, 3: West
+        valid = np.arange(max_num_steps) < num_steps[:, None]
+        turn_offsets = np.array([3, 1, 2])  # left, right, around
+        facing_change = np.where(valid & ~is_move, turn_offsets[turn], 0)
+        facing = (np.cumsum(facing_change, axis=1) - facing_change) % 4
+
+        direction_offsets = np.array([0, 3, 1, 2])  # forward, left, right, backward relative to facing
+        heading = (facing + direction_offsets[direction]) % 4
+        dx, dy = np.array([0, 1, 0, -1]), np.array([1, 0, -1, 0])
+        xs = np.where(is_move, dx[heading] * steps, 0).sum(axis=1)
+        ys = np.where(is_move, dy[heading] * steps, 0).sum(axis=1)
+
+        # Every action is one code into these tables: moves first, then turns
+        num_distances = max_distance - min_distance + 1
+        actions_table = [("move", d, s) for d in directions for s in range(min_distance, max_distance + 1)] + [("turn", t) for t in turns]
+        descriptions_table = [cls._describe([action]) for action in actions_table]
+        codes = np.where(is_move, direction * num_distances + steps - min_distance, len(directions) * num_distances + turn)
+
+        # All actions in one flat list and all descriptions in one string, split per problem afterwards.
+        # A problem's last description is followed by a line break instead of a space.
+        flat_codes = codes[valid].tolist()
+        actions = list(map(actions_table.__getitem__, flat_codes))
+        has_steps = np.flatnonzero(num_steps > 0)
+        codes[has_steps, num_steps[has_steps] - 1] += len(actions_table)
+        separated_table = [description + " " for description in descriptions_table] + [description + "\n" for description in descriptions_table]
+        problems = iter("".join(map(separated_table.__getitem__, codes[valid].tolist())).split("\n"))
+
+        ends = np.cumsum(num_steps).tolist()
+        return [
+            None if is_exhausted else {"seed": seed, "num_words": words_used, "actions": actions[start:end], "position": (x, y), "problem": problem}
+            for seed, start, end, x, y, words_used, is_exhausted, problem in zip(seeds, [0] + ends, ends, xs.tolist(), ys.tolist(), used.tolist(), exhausted.tolist(), (next(problems) if length else "" for length in num_steps.tolist()))
+        ]
+
+    @staticmethod
+    def _describe(actions: list[tuple]) -> str:
+        descriptions = []
+        for action in actions:
+            if action[0] == "move":
+                _, direction, steps = action
+                descriptions.append(f"Take {steps} step{'s' if steps > 1 else ''} {direction}.")
+            else:
+                descriptions.append(f"Turn {action[1]}.")
+
+        return " ".join(descriptions)
+
+    @staticmethod
+    def _walk(actions: list[tuple]) -> tuple[int, int]:
+        x, y = 0, 0  # Starting position
+        facing = 0  # 0: North, 1: East, 2: South, 3: West
+
+        for action in actions:
+            if action[0] == "move":
+                _, direction, steps = action
 
                 if direction == "forward":
                     if facing == 0: y += steps
@@ -56,9 +186,7 @@ class NavigateProblem(BaseProblem):
                     elif facing == 2: x -= steps
                     elif facing == 3: y += steps
             else:
-                turn = self.config.rng.choice(turns)
-                action = f"Turn {turn}."
-                actions.append(action)
+                turn = action[1]
 
                 if turn == "left":
                     facing = (facing - 1) % 4
@@ -67,9 +195,7 @@ class NavigateProblem(BaseProblem):
                 elif turn == "around":
                     facing = (facing + 2) % 4
 
-        self.problem: str = " ".join(actions)
-        self._answer: str = f"({x}, {y})"
-        self.answer: str = self._answer
+        return x, y
 
 
 class NavigateResponseProblem(NavigateProblem, ResponseProblem):
@@ -77,6 +203,11 @@ class NavigateResponseProblem(NavigateProblem, ResponseProblem):
 
 
 class NavigateMultipleChoiceProblem(NavigateProblem, MultipleChoiceProblem):
+    distractor_strategies = {
+        ProblemType.SOLVE_EXPRESSION: CoordinateOffsetDistractor(),
+        ProblemType.CHOOSE_MATCHING_EXPRESSION: NavigateStepDistractor()
+    }
+
     def generate_prompt(self, **kwargs) -> None:
         if ProblemType.SOLVE_EXPRESSION not in self.problem_types and ProblemType.CHOOSE_MATCHING_EXPRESSION not in self.problem_types:
             if self.config.rng.choice([True, False]):
@@ -3,12 +3,22 @@ import random
 import string
 
 from abc import ABC, abstractmethod
+from benchmark import instrumentation
 from benchmark.config import Config
+from benchmark.distractors import Choice, DistractorStrategy, RegenerateDistractor, create_distractors
+from benchmark.records import ProblemRecord
 from enum import Enum
 from utils.problem_type import ProblemType
 
 
 class BaseProblem(ABC):
+    # What the prompt templates read from a problem besides its problem types, answer and options.
+    # Saved in the problem's state, so prompts can be rendered again without regenerating the problem.
+    template_attributes: tuple[str, ...] = ("problem", "_answer")
+    # Range of sizes size_parameters accepts, see benchmark.long_context
+    min_size: int = 1
+    max_size: int | None = None
+
     def __init__(self, config: Config, **kwargs) -> None:
         super().__init__()
 
@@ -16,6 +26,7 @@ class BaseProblem(ABC):
         self.config.increment_seed()  # Allows for example creation to work properly
         self.problem_types: list[ProblemType] = []
         self.seed: int = config.seed
+        self.examples: list = []
 
     def render_template(self, examples: list["BaseProblem"] | None = None, **kwargs) -> str:
         return self.config.render_template(self, examples, **kwargs)
@@ -24,42 +35,51 @@ class BaseProblem(ABC):
     def generate(self) -> None:
         raise NotImplementedError
 
+    @classmethod
+    def size_parameters(cls, size: int) -> dict | None:
+        # Arguments to generate that make the prompt grow with size, None for problems without such a knob
+        return None
+
     @abstractmethod
     def generate_prompt(self, num_shots: int = 0) -> None:
         raise NotImplementedError
 
     def _generate_examples(self, num_shots: int) -> list["BaseProblem"]:
-        examples = []
-        for i in range(num_shots):
-            self.config.increment_seed()
-            # Create an instance of the subclass from which this method is called
-            example_problem = type(self)(config=self.config)
-            example_problem.problem_types = self.problem_types  # Guarentees the correct type of problem is created
-            example_problem.generate(**vars(self))
-            example_problem.generate_prompt(num_shots=0)
-            examples.append(example_problem)
-
-        return examples
+        with instrumentation.stage("examples"):
+            if self.config.example_pool is not None and num_shots > 0:
+                return self.config.example_pool.select(self, num_shots)
+
+            examples = []
+            for i in range(num_shots):
+                self.config.increment_seed()
+                # Create an instance of the subclass from which this method is called
+                example_problem = type(self)(config=self.config)
+                example_problem.problem_types = self.problem_types  # Guarentees the correct type of problem is created
+                example_problem.generate(**vars(self))
+                example_problem.generate_prompt(num_shots=0)
+                examples.append(example_problem)
+
+            return examples
+
+    def to_record(self) -> ProblemRecord:
+        return ProblemRecord(self.problem_name, self.prompt, self.answer, tuple(str(pt) for pt in self.problem_types))
+
+    def to_state(self) -> dict:
+        # Everything benchmark.render needs to render the prompt again, including the examples' own states
+        return {
+            "class": type(self).__name__,
+            "problem_name": self.problem_name,
+            "problem_types": [str(pt) for pt in self.problem_types],
+            "answer": self.answer,
+            "attributes": {name: getattr(self, name) for name in self.template_attributes},
+            "examples": [example.to_state() for example in self.examples]
+        }
 
     def generate_problem_json(self, problem_id: int | None = None) -> dict:
         if problem_id is None:
-            return {
-                f"{self.problem_name}_{'_'.join([str(pt) for pt in self.problem_types])}_{self.seed}": {
-                    "problem_name": self.problem_name,
-                    "prompt": self.prompt,
-                    "answer": self.answer,
-                    "problem_types": [str(pt) for pt in self.problem_types]
-                }
-            }
+            return {f"{self.problem_name}_{'_'.join([str(pt) for pt in self.problem_types])}_{self.seed}": self.to_record().to_json()}
         else:
-            return {
-                f"{problem_id}": {
-                    "problem_name": self.problem_name,
-                    "prompt": self.prompt,
-                    "answer": self.answer,
-                    "problem_types": [str(pt) for pt in self.problem_types]
-                }
-            }
+            return {f"{problem_id}": self.to_record().to_json()}
 
 
 class ResponseProblem(BaseProblem, ABC):
@@ -69,7 +89,8 @@ class ResponseProblem(BaseProblem, ABC):
         self.problem_types.append(ProblemType.RESPONSE)
 
     def generate_prompt(self, num_shots: int = 0) -> None:
-        self.prompt: str = self.render_template(examples=self._generate_examples(num_shots))
+        self.examples = self._generate_examples(num_shots)
+        self.prompt: str = self.render_template(examples=self.examples)
 
 
 class AlternativeAnswer(Enum):
@@ -79,6 +100,9 @@ class AlternativeAnswer(Enum):
 
 
 class MultipleChoiceProblem(BaseProblem, ABC):
+    # Cheap ways to build wrong options for each problem type, anything missing regenerates whole problems
+    distractor_strategies: dict[ProblemType, DistractorStrategy] = {}
+
     def __init__(self, config: Config, **kwargs) -> None:
         super().__init__(config, **kwargs)
 
@@ -120,10 +144,11 @@ class MultipleChoiceProblem(BaseProblem, ABC):
         if num_options > len(option_labels):
             raise ValueError("Number of options requested exceeds the available unique labels.")
 
-        option_pairs: list[tuple[str, ResponseProblem]]
+        option_pairs: list[tuple[str, ResponseProblem | Choice]]
         correct_label: str
 
-        option_pairs, correct_label = self._create_additional_choices(option_labels, num_options)
+        with instrumentation.stage("distractors"):
+            option_pairs, correct_label = self._create_additional_choices(option_labels, num_options)
 
         if self.config.rng.random() < no_other_answer_probability:
             choice = self.config.rng.choice([1, 2, 3])
@@ -139,7 +164,8 @@ class MultipleChoiceProblem(BaseProblem, ABC):
         self.options = dict(option_pairs)
         self.option_labels = option_labels
 
-        self.prompt = self.render_template(examples=self._generate_examples(num_shots))
+        self.examples = self._generate_examples(num_shots)
+        self.prompt = self.render_template(examples=self.examples)
 
     def _generate_option_labels(
         self, 
@@ -176,8 +202,8 @@ class MultipleChoiceProblem(BaseProblem, ABC):
 
         return options[:num_options]
 
-    def _create_additional_choices(self, option_labels: list[str], num_options: int) -> tuple[list[tuple[str, ResponseProblem]], str, int]:
-        option_pairs: list[tuple[str, ResponseProblem]] = [(label, None) for label in option_labels]
+    def _create_additional_choices(self, option_labels: list[str], num_options: int) -> tuple[list[tuple[str, ResponseProblem | Choice]], str]:
+        option_pairs: list[tuple[str, ResponseProblem | Choice]] = [(label, None) for label in option_labels]
 
         # Set the correct answer to this problem to a random label
         random_label = self.config.rng.choice([label for label, option in option_pairs if option is None])
@@ -187,15 +213,8 @@ class MultipleChoiceProblem(BaseProblem, ABC):
                 correct_label = label
                 break
 
-        problems = []
-        while len(problems) < num_options - 1:
-            self.config.increment_seed()
-            new_problem = self.problems["response"](config=self.config)
-            new_problem.problem_types = self.problem_types  # Guarentees the correct type of problem is created
-            new_problem.generate(**vars(self))
-
-            if new_problem._answer != self._answer and new_problem.problem not in [option.problem for label, option in option_pairs if option is not None]:
-                problems.append(new_problem)
+        problem_type = ProblemType.CHOOSE_MATCHING_EXPRESSION if ProblemType.CHOOSE_MATCHING_EXPRESSION in self.problem_types else ProblemType.SOLVE_EXPRESSION
+        problems = create_distractors(self, num_options - 1, self.distractor_strategies.get(problem_type, RegenerateDistractor()))
 
         for i, (label, option) in enumerate(option_pairs):
             if option is None and problems:
@@ -203,11 +222,20 @@ class MultipleChoiceProblem(BaseProblem, ABC):
 
         return option_pairs, correct_label
 
-    def generate_problem_json(self, problem_id: int | None = None) -> dict:
-        problem_json = super().generate_problem_json(problem_id)
-        problem_json.update({
-            "options": self.options,
-            "answer": self.answer
-        })
-
-        return problem_json
+    def option_text(self, label: str) -> str:
+        # The text multiple_choice_format.jinja shows for the option
+        if label in self.alternate_display_answers:
+            return self.alternate_display_answers[label].value
+        if ProblemType.CHOOSE_MATCHING_EXPRESSION in self.problem_types:
+            return str(self.options[label].problem)
+        return str(self.options[label]._answer)
+
+    def to_record(self) -> ProblemRecord:
+        options = tuple((label, self.option_text(label)) for label in self.option_labels)
+        return ProblemRecord(self.problem_name, self.prompt, self.answer, tuple(str(pt) for pt in self.problem_types), options)
+
+    def to_state(self) -> dict:
+        state = super().to_state()
+        state["options"] = [[label, self.option_text(label)] for label in self.option_labels]
+        state["alternate_display_answers"] = {label: alternative.value for label, alternative in self.alternate_display_answers.items()}
+        return state
@@ -0,0 +1,48 @@
+from typing import Any, Iterable
+
+
+class ProblemRecord:
+    # Everything that is written out for a problem, without the generator state behind it.
+    # state is only kept when the problem's state is saved for benchmark.render.
+    __slots__ = ("problem_name", "prompt", "answer", "problem_types", "options", "state")
+
+    def __init__(self, problem_name: str, prompt: str, answer: Any, problem_types: tuple[str, ...], options: Iterable[tuple[str, str]] | None = None, state: dict | None = None) -> None:
+        object.__setattr__(self, "problem_name", problem_name)
+        object.__setattr__(self, "prompt", prompt)
+        object.__setattr__(self, "answer", answer)
+        object.__setattr__(self, "problem_types", tuple(problem_types))
+        # Labels and texts in one flat tuple, a tuple per option would cost more than a short option's text
+        object.__setattr__(self, "options", tuple(part for option in options for part in option) if options is not None else None)
+        object.__setattr__(self, "state", state)
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError("ProblemRecord is immutable")
+
+    def __reduce__(self) -> tuple:
+        return ProblemRecord, (self.problem_name, self.prompt, self.answer, self.problem_types, self.option_pairs(), self.state)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, ProblemRecord) and self.to_json() == other.to_json()
+
+    def __getitem__(self, key: str) -> Any:
+        # Reads like the dict generate_problem_json returns, e.g. record["prompt"]
+        return self.to_json()[key]
+
+    def with_state(self, state: dict) -> "ProblemRecord":
+        return ProblemRecord(self.problem_name, self.prompt, self.answer, self.problem_types, self.option_pairs(), state)
+
+    def option_pairs(self) -> tuple[tuple[str, str], ...] | None:
+        if self.options is None:
+            return None
+        return tuple(zip(self.options[::2], self.options[1::2]))
+
+    def to_json(self) -> dict:
+        problem_json = {
+            "problem_name": self.problem_name,
+            "prompt": self.prompt,
+            "answer": self.answer,
+            "problem_types": list(self.problem_types)
+        }
+        if self.options is not None:
+            problem_json["options"] = dict(self.option_pairs())
+        return problem_json
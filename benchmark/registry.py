@@ -0,0 +1,91 @@
+import importlib
+
+from benchmark.problems.problem import BaseProblem
+
+
+# Class name -> "module:attribute", a module is only imported once one of its classes is selected
+PROBLEM_CLASSES: dict[str, str] = {
+    "BooleanExpressionResponseProblem": "benchmark.problems.boolean_expression_problem:BooleanExpressionResponseProblem",
+    "BooleanExpressionMultipleChoiceProblem": "benchmark.problems.boolean_expression_problem:BooleanExpressionMultipleChoiceProblem",
+    "DyckLanguageResponseProblem": "benchmark.problems.dyck_language_problem:DyckLanguageResponseProblem",
+    "DyckLanguageMultipleChoiceProblem": "benchmark.problems.dyck_language_problem:DyckLanguageMultipleChoiceProblem",
+    "LiarResponseProblem": "benchmark.problems.liar_problem:LiarResponseProblem",
+    "LiarMultipleChoiceProblem": "benchmark.problems.liar_problem:LiarMultipleChoiceProblem",
+    "LogicalDeductionNPeopleResponseProblem": "benchmark.problems.logical_deduction_n_people_problem:LogicalDeductionNPeopleResponseProblem",
+    "LogicalDeductionNPeopleMultipleChoiceProblem": "benchmark.problems.logical_deduction_n_people_problem:LogicalDeductionNPeopleMultipleChoiceProblem",
+    "MathExpressionResponseProblem": "benchmark.problems.math_expression_problem:MathExpressionResponseProblem",
+    "MathExpressionMultipleChoiceProblem": "benchmark.problems.math_expression_problem:MathExpressionMultipleChoiceProblem",
+    "NavigateResponseProblem": "benchmark.problems.navigate_problem:NavigateResponseProblem",
+    "NavigateMultipleChoiceProblem": "benchmark.problems.navigate_problem:NavigateMultipleChoiceProblem",
+    "PeopleSortingResponseProblem": "benchmark.problems.people_sorting_problem:PeopleSortingResponseProblem",
+    "PeopleSortingMultipleChoiceProblem": "benchmark.problems.people_sorting_problem:PeopleSortingMultipleChoiceProblem"
+}
+
+# Used when no problems are given
+DEFAULT_PROBLEMS: list[str] = [
+    "PeopleSortingResponseProblem",
+    "PeopleSortingMultipleChoiceProblem"
+]
+
+# Other packages add problem classes with entry points in this group, e.g. in pyproject.toml:
+# [project.entry-points."dinos.problems"]
+# MyResponseProblem = "my_package.problems:MyResponseProblem"
+ENTRY_POINT_GROUP: str = "dinos.problems"
+
+_available: dict[str, str] | None = None
+_loaded: dict[str, BaseProblem] = {}
+
+
+def available_problems() -> dict[str, str]:
+    # Entry points are only scanned for names that aren't built in, importlib.metadata alone takes longer to import than dinos.py
+    global _available
+    if _available is None:
+        from importlib.metadata import entry_points
+        _available = dict(PROBLEM_CLASSES)
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            _available.setdefault(entry_point.name, entry_point.value)
+    return _available
+
+def load_problem_class(name: str) -> BaseProblem:
+    problem_class = _loaded.get(name)
+    if problem_class is not None:
+        return problem_class
+
+    target = PROBLEM_CLASSES.get(name) or available_problems().get(name)
+    if target is None:
+        raise ValueError(f"Unknown problem class '{name}', available: {', '.join(sorted(available_problems()))}")
+
+    module_name, _, attribute = target.partition(":")
+    problem_class = _loaded[name] = getattr(importlib.import_module(module_name), attribute)
+    return problem_class
+
+def parse_problems(spec: str) -> dict[str, float | None]:
+    # "name[:weight],..." -> {name: weight}, names without a weight map to None
+    problems = {}
+    for part in spec.split(","):
+        name, _, weight = part.strip().partition(":")
+        if not name:
+            continue
+        if name not in PROBLEM_CLASSES and name not in available_problems():
+            raise ValueError(f"Unknown problem class '{name}', available: {', '.join(sorted(available_problems()))}")
+        if name in problems:
+            raise ValueError(f"Problem class '{name}' is listed more than once")
+        if weight:
+            try:
+                problems[name] = float(weight)
+            except ValueError:
+                raise ValueError(f"Invalid weight '{weight}' for problem class '{name}'") from None
+            if problems[name] <= 0:
+                raise ValueError(f"Weight of problem class '{name}' must be > 0")
+        else:
+            problems[name] = None
+
+    if not problems:
+        raise ValueError("No problem classes given")
+    return problems
+
+def get_problem_weights(problems: dict[str, float | None], names: list[str]) -> list[float] | None:
+    # None when no weight was given, so classes are drawn uniformly exactly as without weights
+    if all(problems.get(name) is None for name in names):
+        return None
+    return [problems.get(name) or 1.0 for name in names]
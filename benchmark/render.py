@@ -0,0 +1,168 @@
+import argparse
+import itertools
+import multiprocessing
+import os
+from typing import Iterator
+
+from tqdm import tqdm
+
+from benchmark.config import Config
+from benchmark.problems.problem import AlternativeAnswer, BaseProblem
+from benchmark.records import ProblemRecord
+from benchmark.registry import load_problem_class
+from benchmark.scoring import iter_benchmark
+from benchmark.storage import DinosBenchmarkReader, is_dinos, is_jsonl, iter_jsonl, open_benchmark_writer, read_jsonl_header, split_compression
+from utils.problem_type import ProblemType
+
+
+_worker_state: dict = {}
+
+
+class StateOption:
+    # An option as multiple_choice_format.jinja reads it, the saved text is what either problem type shows
+    __slots__ = ("problem", "_answer")
+
+    def __init__(self, text: str) -> None:
+        self.problem = text
+        self._answer = text
+
+
+class StateProblem:
+    # Stands in for the problem in the templates, built from its saved state instead of generating it again
+    def __init__(self, state: dict, config: Config) -> None:
+        self.problem_name: str = state["problem_name"]
+        self.problem_types: list[ProblemType] = [ProblemType(problem_type) for problem_type in state["problem_types"]]
+        self.answer = state["answer"]
+        self.__dict__.update(state["attributes"])
+        if "options" in state:
+            self.option_labels: list[str] = [label for label, _ in state["options"]]
+            self.options: dict[str, StateOption] = {label: StateOption(text) for label, text in state["options"]}
+            self.alternate_display_answers: dict[str, AlternativeAnswer] = {label: AlternativeAnswer(value) for label, value in state["alternate_display_answers"].items()}
+
+        self.examples: list[StateProblem] = [StateProblem(example, config) for example in state["examples"]]
+        self.prompt: str = config.render_template(self, examples=self.examples)
+
+    def __getattr__(self, name: str):
+        # Only reached for attributes missing from the state, which Jinja would otherwise render as empty strings
+        if name.startswith("__"):
+            raise AttributeError(name)
+        raise ValueError(f"A template reads '{name}' of {self.problem_name}, which isn't saved in its state. Add it to template_attributes of the problem class and generate the state again")
+
+
+def render_state(state: dict, config: Config) -> ProblemRecord:
+    options = [tuple(option) for option in state["options"]] if "options" in state else None
+    return ProblemRecord(state["problem_name"], StateProblem(state, config).prompt, state["answer"], tuple(state["problem_types"]), options)
+
+def template_hashes(config: Config, selected_problem_classes: list[BaseProblem]) -> dict[str, str]:
+    # One hash per problem name, over its template and the templates it includes
+    problem_names = {problem_class(config=Config(seed=0)).problem_name for problem_class in selected_problem_classes}
+    return {problem_name: config.template_hash(problem_name + ".jinja") for problem_name in sorted(problem_names)}
+
+def language_config(seed: int, language: str | None = None) -> Config:
+    # Templates missing from the language's directory fall back to English
+    return Config(seed=seed, languages=[language]) if language is not None else Config(seed=seed)
+
+def language_path(path: str, language: str) -> str:
+    # benchmark.jsonl.gz -> benchmark.de.jsonl.gz
+    base, compression = split_compression(path)
+    root, extension = os.path.splitext(base)
+    return f"{root}.{language}{extension}" + (f".{compression}" if compression is not None else "")
+
+def read_benchmark_header(path: str) -> dict | None:
+    if is_dinos(path):
+        with DinosBenchmarkReader(path) as reader:
+            return reader.header
+    if is_jsonl(path):
+        return read_jsonl_header(path)
+    return None  # The .json layout only keeps the seed
+
+def _init_worker(seed: int, language: str | None) -> None:
+    _worker_state["config"] = language_config(seed, language)
+
+def _render_in_worker(state: dict) -> dict:
+    return render_state(state, _worker_state["config"]).to_json()
+
+def render_benchmark(state_path: str, output_path: str, previous_path: str | None = None, workers: int = 1, batch_size: int = 65536, language: str | None = None) -> tuple[int, int]:
+    # Renders the prompts of a state file written by benchmark.dinos --state, with the templates of language if given.
+    # With previous_path, a benchmark rendered from the same state, problems whose templates have the same hash as
+    # back then are copied from it instead. Returns the number of rendered and copied problems.
+    if workers < 1:
+        raise ValueError("workers must be >= 1")
+    if previous_path is not None and os.path.abspath(previous_path) == os.path.abspath(output_path):
+        raise ValueError("The output can't overwrite the previous benchmark it copies problems from")
+
+    states = iter_jsonl(state_path)
+    header = next(states, None)
+    if header is None:
+        raise ValueError(f"'{state_path}' is empty")
+
+    config = language_config(header["seed"], language)
+    hashes = template_hashes(config, [load_problem_class(name) for name in header["problem_classes"]])
+    output_header = dict(header, template_hashes=hashes)
+    if language is not None:
+        output_header["language"] = language
+
+    unchanged: set[str] = set()
+    previous: Iterator[tuple[str, dict]] | None = None
+    if previous_path is not None:
+        previous_header = read_benchmark_header(previous_path)
+        if previous_header is None or "template_hashes" not in previous_header:
+            raise ValueError(f"'{previous_path}' doesn't record the templates it was rendered with, render it from the state once without a previous benchmark")
+        if {key: value for key, value in previous_header.items() if key not in ("template_hashes", "language")} != header:
+            raise ValueError(f"'{previous_path}' wasn't generated with the same settings as '{state_path}'")
+        if previous_header.get("language") == language:
+            unchanged = {problem_name for problem_name, template_hash in hashes.items() if previous_header["template_hashes"].get(problem_name) == template_hash}
+        previous = iter_benchmark(previous_path)
+
+    num_rendered = num_copied = 0
+    pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(header["seed"], language)) if workers > 1 else None
+    try:
+        with open_benchmark_writer(output_path, output_header) as writer, tqdm(total=header["num_problems"]) as progress:
+            while batch := list(itertools.islice(states, batch_size)):
+                copied: list[dict | None] = [None] * len(batch)
+                if previous is not None:
+                    for i, state in enumerate(batch):
+                        previous_id, problem = next(previous, (None, None))
+                        if previous_id != str(state["id"]):
+                            raise ValueError(f"'{previous_path}' has problem {previous_id} where '{state_path}' has {state['id']}")
+                        if problem["problem_name"] in unchanged:
+                            copied[i] = problem
+
+                to_render = [state for state, problem in zip(batch, copied) if problem is None]
+                if pool is not None:
+                    rendered = iter(pool.map(_render_in_worker, to_render, chunksize=max(1, len(to_render) // (workers * 4))))
+                else:
+                    rendered = (render_state(state, config).to_json() for state in to_render)
+
+                for state, problem in zip(batch, copied):
+                    if problem is None:
+                        problem = next(rendered)
+                        num_rendered += 1
+                    else:
+                        problem.pop("id", None)
+                        num_copied += 1
+                    writer.write(str(state["id"]), problem)
+
+                progress.update(len(batch))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    return num_rendered, num_copied
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Render the prompts of a benchmark from the problem states saved by benchmark.dinos --state.")
+    parser.add_argument('--state', type=str, help='State file written by benchmark.dinos --state', required=True)
+    parser.add_argument('--output', type=str, help='Benchmark file to write, .json, .jsonl or .dinos', required=True)
+    parser.add_argument('--previous', type=str, help='Benchmark rendered from the same state before, problems whose templates did not change since are copied from it', default=None)
+    parser.add_argument('--workers', type=int, help='Number of processes used to render prompts', default=1)
+    parser.add_argument('--language', type=str, help='Render with the templates under prompts/<language>, falling back to English', default=None)
+
+    args = parser.parse_args()
+
+    num_rendered, num_copied = render_benchmark(args.state, args.output, previous_path=args.previous, workers=args.workers, language=args.language)
+    print(f"Rendered {num_rendered} problems, copied {num_copied} with unchanged templates")
+
+if __name__ == '__main__':
+    main()
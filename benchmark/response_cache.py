@@ -0,0 +1,85 @@
+import hashlib
+import json
+import sqlite3
+import time
+
+
+def prompt_digest(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+def cache_key(model: str, endpoint: str, params: dict, prompt: str) -> str:
+    # Same seed and templates give the same prompt, so repeated and overlapping runs share keys.
+    # The chat endpoint wraps the prompt in the model's chat template and completions doesn't, so their responses differ.
+    return hashlib.sha256(json.dumps([model, endpoint, params, prompt_digest(prompt)], sort_keys=True).encode()).hexdigest()
+
+
+class ResponseCache:
+    # Model responses in SQLite, evicting the least recently used ones once the stored responses exceed max_bytes
+    def __init__(self, path: str, max_bytes: int = 1 << 30, commit_interval: int = 256) -> None:
+        self.path: str = path
+        self.max_bytes: int = max_bytes
+        self.commit_interval: int = commit_interval
+        self.hits: int = 0
+        self.misses: int = 0
+        self._uncommitted: int = 0
+
+        self.connection: sqlite3.Connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, last_used INTEGER NOT NULL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self.size: int = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _maybe_commit(self) -> None:
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_interval:
+            self.connection.commit()
+            self._uncommitted = 0
+
+    def get(self, key: str) -> str | None:
+        row = self.connection.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.connection.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time_ns(), key))
+        self._maybe_commit()
+        return row[0]
+
+    def put(self, key: str, response: str) -> None:
+        size = len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        previous = self.connection.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        self.connection.execute("INSERT OR REPLACE INTO responses (key, response, size, last_used) VALUES (?, ?, ?, ?)", (key, response, size, time.time_ns()))
+        self.size += size - (previous[0] if previous else 0)
+
+        if self.size > self.max_bytes:
+            self._evict()
+        self._maybe_commit()
+
+    def _evict(self) -> None:
+        while self.size > self.max_bytes:
+            rows = self.connection.execute("SELECT key, size FROM responses ORDER BY last_used LIMIT 256").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if self.size <= self.max_bytes:
+                    break
+                self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.size -= size
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self) -> None:
+        self.connection.commit()
+        self.connection.close()
+
+    def __enter__(self) -> "ResponseCache":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
@@ -0,0 +1,217 @@
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+from urllib.parse import urlsplit
+
+from tqdm import tqdm
+
+from benchmark.response_cache import ResponseCache, cache_key
+from benchmark.scoring import iter_benchmark
+from benchmark.storage import iter_jsonl, open_text
+
+
+RETRY_STATUSES: set[int] = {408, 409, 429, 500, 502, 503, 504}
+
+
+class RequestError(Exception):
+    def __init__(self, message: str, retryable: bool) -> None:
+        super().__init__(message)
+        self.retryable: bool = retryable
+
+
+class ModelClient:
+    # Blocking client for an OpenAI-compatible server, each thread keeps its own keep-alive connection
+    def __init__(self, base_url: str, model: str, api_key: str | None = None, endpoint: str = "chat", max_tokens: int = 256, temperature: float = 0.0, timeout: float = 120.0) -> None:
+        if endpoint not in ("chat", "completions"):
+            raise ValueError("endpoint must be 'chat' or 'completions'")
+
+        url = urlsplit(base_url)
+        self.scheme: str = url.scheme
+        self.netloc: str = url.netloc
+        self.path: str = url.path.rstrip("/") + ("/chat/completions" if endpoint == "chat" else "/completions")
+        self.model: str = model
+        self.api_key: str | None = api_key
+        self.endpoint: str = endpoint
+        self.max_tokens: int = max_tokens
+        self.temperature: float = temperature
+        self.timeout: float = timeout
+        self._local: threading.local = threading.local()
+
+    def params(self) -> dict:
+        # Decoding parameters that change the response for a given prompt
+        return {"max_tokens": self.max_tokens, "temperature": self.temperature}
+
+    def _connection(self) -> http.client.HTTPConnection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            connection = self._local.connection = connection_class(self.netloc, timeout=self.timeout)
+        return connection
+
+    def _post(self, payload: dict) -> dict:
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+
+        connection = self._connection()
+        try:
+            connection.request("POST", self.path, body=json.dumps(payload).encode(), headers=headers)
+            response = connection.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            connection.close()
+            self._local.connection = None
+            raise RequestError(f"{type(e).__name__}: {e}", retryable=True) from e
+
+        if response.status != 200:
+            raise RequestError(f"HTTP {response.status}: {body[:200].decode(errors='replace')}", retryable=response.status in RETRY_STATUSES)
+
+        try:
+            return json.loads(body)
+        except ValueError as e:
+            raise RequestError(f"Malformed response: {e}", retryable=False) from e
+
+    def complete(self, prompts: list[str]) -> list[str]:
+        if self.endpoint == "chat":
+            if len(prompts) != 1:
+                raise ValueError("The chat endpoint takes one prompt per request, use the completions endpoint for batching")
+            data = self._post({"model": self.model, "messages": [{"role": "user", "content": prompts[0]}], **self.params()})
+        else:
+            data = self._post({"model": self.model, "prompt": prompts, **self.params()})
+
+        # A 200 without the expected fields fails only the prompts of this request, not the whole run
+        try:
+            if self.endpoint == "chat":
+                texts = [data["choices"][0]["message"]["content"]]
+            else:
+                texts = [None] * len(prompts)
+                for choice in data["choices"]:
+                    texts[choice["index"]] = choice["text"]
+        except (KeyError, IndexError, TypeError) as e:
+            raise RequestError(f"Malformed response: {type(e).__name__}: {e}", retryable=False) from e
+
+        # A prompt without a choice would be written as answered with no response and never retried on resume
+        missing = [i for i, text in enumerate(texts) if text is None]
+        if missing:
+            raise RequestError(f"Malformed response: missing choices for prompts {', '.join(map(str, missing))} of {len(prompts)}", retryable=False)
+        return texts
+
+
+def iter_batches(benchmark_path: str, batch_size: int, skip_ids: set[str]) -> Iterator[list[tuple[str, str]]]:
+    batch = []
+    for problem_id, problem in iter_benchmark(benchmark_path):
+        if problem_id in skip_ids:
+            continue
+        batch.append((problem_id, problem["prompt"]))
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+async def request_with_retries(client: ModelClient, executor: ThreadPoolExecutor, prompts: list[str], max_retries: int = 5, backoff: float = 1.0) -> tuple[list[str] | None, int, str | None]:
+    # Exponential backoff with jitter, so throttled requests don't all come back at once
+    loop = asyncio.get_running_loop()
+    for attempt in range(max_retries + 1):
+        try:
+            return await loop.run_in_executor(executor, client.complete, prompts), attempt + 1, None
+        except RequestError as e:
+            if not e.retryable or attempt == max_retries:
+                return None, attempt + 1, str(e)
+            await asyncio.sleep(backoff * 2 ** attempt * (0.5 + random.random()))
+
+async def run_benchmark(benchmark_path: str, output_path: str, client: ModelClient, concurrency: int = 16, batch_size: int = 1, max_retries: int = 5, backoff: float = 1.0, resume: bool = False, cache: ResponseCache | None = None) -> None:
+    # Writes one {"id", "response", "latency", "attempts"} line per problem in the order they finish.
+    # Prompts found in the cache are written with "cached": true and are not sent.
+    if concurrency < 1 or batch_size < 1:
+        raise ValueError("concurrency and batch_size must be >= 1")
+    if batch_size > 1 and client.endpoint == "chat":
+        raise ValueError("Batching requires the completions endpoint")
+
+    done_ids: set[str] = set()
+    if resume and os.path.exists(output_path):
+        # Failed requests are sent again, their new line is appended after the one with the error
+        done_ids = {record["id"] for record in iter_jsonl(output_path) if "error" not in record}
+
+    # A bounded queue keeps only a few batches per request slot in memory
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    progress = tqdm(unit="problems")
+
+    async def produce() -> None:
+        for batch in iter_batches(benchmark_path, batch_size, done_ids):
+            await queue.put(batch)
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def consume(output_file, executor: ThreadPoolExecutor) -> None:
+        while (batch := await queue.get()) is not None:
+            if cache is not None:
+                keys = {problem_id: cache_key(client.model, client.endpoint, client.params(), prompt) for problem_id, prompt in batch}
+                uncached = []
+                for problem_id, prompt in batch:
+                    response = cache.get(keys[problem_id])
+                    if response is None:
+                        uncached.append((problem_id, prompt))
+                    else:
+                        output_file.write(json.dumps({"id": problem_id, "response": response, "latency": 0.0, "attempts": 0, "cached": True}) + "\n")
+                progress.update(len(batch) - len(uncached))
+                batch = uncached
+                if not batch:
+                    continue
+
+            start = time.perf_counter()
+            responses, attempts, error = await request_with_retries(client, executor, [prompt for _, prompt in batch], max_retries, backoff)
+            latency = time.perf_counter() - start
+
+            for i, (problem_id, _) in enumerate(batch):
+                record = {"id": problem_id, "response": responses[i] if responses is not None else None, "latency": latency, "attempts": attempts}
+                if error is not None:
+                    record["error"] = error
+                elif cache is not None and record["response"] is not None:
+                    cache.put(keys[problem_id], record["response"])
+                output_file.write(json.dumps(record) + "\n")
+            progress.update(len(batch))
+
+    with open_text(output_path, "a" if resume else "w") as output_file, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        await asyncio.gather(produce(), *(consume(output_file, executor) for _ in range(concurrency)))
+    progress.close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Send the prompts of a DINOS benchmark to an OpenAI-compatible server.")
+    parser.add_argument('--benchmark', type=str, help='Benchmark file created by benchmark.dinos', required=True)
+    parser.add_argument('--output', type=str, help='.jsonl file to write the responses to', default='responses.jsonl')
+    parser.add_argument('--base_url', type=str, help='Base URL of the server, e.g. http://localhost:8000/v1', default='http://localhost:8000/v1')
+    parser.add_argument('--model', type=str, help='Model name sent with each request', required=True)
+    parser.add_argument('--api_key', type=str, help='API key, defaults to the OPENAI_API_KEY environment variable', default=os.environ.get("OPENAI_API_KEY"))
+    parser.add_argument('--endpoint', type=str, choices=['chat', 'completions'], help='Use /chat/completions or /completions', default='chat')
+    parser.add_argument('--concurrency', type=int, help='Maximum number of requests in flight', default=16)
+    parser.add_argument('--batch_size', type=int, help='Prompts per request, only for the completions endpoint', default=1)
+    parser.add_argument('--max_retries', type=int, help='Retries for throttled or failed requests', default=5)
+    parser.add_argument('--backoff', type=float, help='Initial retry delay in seconds, doubled on each retry', default=1.0)
+    parser.add_argument('--max_tokens', type=int, help='Maximum tokens per response', default=256)
+    parser.add_argument('--temperature', type=float, help='Sampling temperature', default=0.0)
+    parser.add_argument('--timeout', type=float, help='Request timeout in seconds', default=120.0)
+    parser.add_argument('--resume', action='store_true', help='Skip problems that already have a line without an error in the output file')
+    parser.add_argument('--cache', type=str, help='SQLite file caching responses by model, endpoint, decoding parameters and prompt', default=None)
+    parser.add_argument('--cache_size_mb', type=float, help='Least recently used responses are evicted above this size', default=1024)
+
+    args = parser.parse_args()
+
+    client = ModelClient(args.base_url, args.model, api_key=args.api_key, endpoint=args.endpoint, max_tokens=args.max_tokens, temperature=args.temperature, timeout=args.timeout)
+    cache = ResponseCache(args.cache, max_bytes=int(args.cache_size_mb * 1024 * 1024)) if args.cache is not None else None
+    try:
+        asyncio.run(run_benchmark(args.benchmark, args.output, client, concurrency=args.concurrency, batch_size=args.batch_size, max_retries=args.max_retries, backoff=args.backoff, resume=args.resume, cache=cache))
+    finally:
+        if cache is not None:
+            print(f"Response cache: {cache.hits} hits, {cache.misses} misses")
+            cache.close()
+
+if __name__ == '__main__':
+    main()
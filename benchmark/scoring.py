@@ -0,0 +1,205 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import re
+import sqlite3
+import sys
+from typing import Any, Callable, Iterable, Iterator
+
+from tqdm import tqdm
+
+from benchmark.storage import DinosBenchmarkReader, is_dinos, is_jsonl, iter_jsonl, open_text
+from utils.problem_type import ProblemType
+
+
+_STRIP_CHARS: str = " \t\r\n.*`'\""  # Trailing periods and markdown or quotes around an otherwise correct answer
+_LABEL_PATTERN: re.Pattern = re.compile(r"(?:answer\s*(?:is)?\s*[:\-]?\s*)?\(?([A-Za-z0-9]+)\)?[.:]?", re.IGNORECASE)
+_COORDINATES_PATTERN: re.Pattern = re.compile(r"\(?\s*(-?\d+)\s*,\s*(-?\d+)\s*\)?")
+_NAME_SEPARATORS: re.Pattern = re.compile(r"[\s,]+")
+MAX_PENDING_RESPONSES: int = 65536  # Responses read ahead in memory before the rest are indexed on disk
+
+
+def normalize_label(text: str) -> str | None:
+    match = _LABEL_PATTERN.fullmatch(text.strip(_STRIP_CHARS))
+    return match.group(1) if match else None
+
+def normalize_integer(text: str) -> int | None:
+    try:
+        return int(text.strip(_STRIP_CHARS).replace(",", ""))
+    except ValueError:
+        return None
+
+def normalize_boolean(text: str) -> bool | None:
+    return {"true": True, "false": False}.get(text.strip(_STRIP_CHARS).lower())
+
+def normalize_coordinates(text: str) -> tuple[int, int] | None:
+    match = _COORDINATES_PATTERN.fullmatch(text.strip(_STRIP_CHARS))
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+def normalize_names(text: str) -> tuple[str, ...]:
+    return tuple(name for name in _NAME_SEPARATORS.split(text.strip(_STRIP_CHARS)) if name)
+
+def normalize_brackets(text: str) -> str:
+    return "".join(text.split())
+
+def normalize_text(text: str) -> str:
+    return text.strip(_STRIP_CHARS)
+
+
+# Response problems are normalized by problem name, multiple choice problems always by label
+ANSWER_NORMALIZERS: dict[str, Callable[[str], Any]] = {
+    "boolean_expression_problem": normalize_boolean,
+    "dyck_language_problem": normalize_brackets,
+    "liar_problem": normalize_boolean,
+    "logical_deduction_n_people_problem": normalize_integer,
+    "math_expression_problem": normalize_integer,
+    "navigate_problem": normalize_coordinates,
+    "people_sorting_problem": normalize_names
+}
+
+
+def get_normalizer(problem_name: str, problem_types: Iterable[str]) -> Callable[[str], Any]:
+    if str(ProblemType.MULTIPLE_CHOICE) in problem_types:
+        return normalize_label
+    return ANSWER_NORMALIZERS.get(problem_name, normalize_text)
+
+def grade(problem_name: str, problem_types: list[str], answer: Any, response: str | None) -> bool:
+    if response is None:
+        return False
+
+    normalize = get_normalizer(problem_name, problem_types)
+    normalized_response = normalize(str(response))
+    return normalized_response is not None and normalized_response == normalize(str(answer))
+
+def _grade_task(task: tuple) -> bool:
+    return grade(*task)
+
+def iter_benchmark(path: str) -> Iterator[tuple[str, dict]]:
+    if is_jsonl(path):
+        records = iter_jsonl(path)
+        next(records, None)  # Header
+        for record in records:
+            yield str(record["id"]), record
+    elif is_dinos(path):
+        with DinosBenchmarkReader(path) as reader:
+            for record in reader:
+                yield str(record["id"]), record
+    else:
+        # The original .json layout has to be loaded whole
+        with open_text(path) as f:
+            yield from json.load(f)["problems"].items()
+
+def iter_responses(path: str) -> Iterator[tuple[str, str | None]]:
+    # Failed requests have no response, a resumed run appends the retried response later in the file
+    for record in iter_jsonl(path):
+        if "error" not in record:
+            yield str(record["id"]), record.get("response")
+
+def _index_responses(pending: dict[str, str | None], responses: Iterator[tuple[str, str | None]]) -> sqlite3.Connection:
+    # The pending and all remaining responses in a temporary SQLite database, which SQLite deletes when it is closed.
+    # The first response for an id is kept, as in join_responses.
+    connection = sqlite3.connect("")
+    connection.execute("CREATE TABLE responses (id TEXT PRIMARY KEY, response TEXT)")
+    connection.executemany("INSERT OR IGNORE INTO responses (id, response) VALUES (?, ?)", itertools.chain(pending.items(), responses))
+    return connection
+
+def join_responses(problems: Iterable[tuple[str, dict]], responses: Iterable[tuple[str, str | None]], max_pending: int = MAX_PENDING_RESPONSES) -> Iterator[tuple[str, dict, str | None]]:
+    # Responses are read ahead only until the current problem's response turns up, so memory stays constant when both
+    # files are in the same order and only grows with how far out of order the responses are. The runner writes them
+    # in the order they finish and appends retries on resume, so once more than max_pending are waiting, the rest of
+    # the responses are indexed in a temporary SQLite database and looked up from there instead.
+    # A problem gets the first response with its id in either case, a later one can't be known about without reading the
+    # whole file. Resumed runs only append retries after lines with an error, which iter_responses skips.
+    responses = iter(responses)
+    pending: dict[str, str | None] = {}
+    index = None
+
+    try:
+        for problem_id, problem in problems:
+            while index is None and problem_id not in pending:
+                if len(pending) >= max_pending:
+                    index = _index_responses(pending, responses)
+                    pending.clear()
+                    break
+                response_id, response = next(responses, (None, None))
+                if response_id is None:
+                    break
+                pending.setdefault(response_id, response)
+
+            if index is not None:
+                row = index.execute("SELECT response FROM responses WHERE id = ?", (problem_id,)).fetchone()
+                yield problem_id, problem, row[0] if row is not None else None
+            else:
+                yield problem_id, problem, pending.pop(problem_id, None)
+    finally:
+        if index is not None:
+            index.close()
+
+def score(benchmark_path: str, responses_path: str, results_path: str | None = None, workers: int = 1, batch_size: int = 65536) -> dict:
+    # Grades batch_size responses at a time, so memory does not grow with the size of the benchmark
+    if workers < 1:
+        raise ValueError("workers must be >= 1")
+
+    summary: dict = {"correct": 0, "total": 0, "missing": 0, "by_problem": {}}
+    joined = join_responses(iter_benchmark(benchmark_path), iter_responses(responses_path))
+
+    results_file = open_text(results_path, "w") if results_path is not None else None
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        with tqdm() as progress:
+            while batch := list(itertools.islice(joined, batch_size)):
+                # Only the fields needed for grading are sent to the workers, the prompts stay in this process
+                tasks = [(problem["problem_name"], problem["problem_types"], problem["answer"], response) for _, problem, response in batch]
+                if pool is not None:
+                    grades = pool.map(_grade_task, tasks, chunksize=max(1, len(tasks) // (workers * 4)))
+                else:
+                    grades = list(map(_grade_task, tasks))
+
+                for (problem_id, problem, response), correct in zip(batch, grades):
+                    key = f"{problem['problem_name']}_{'_'.join(problem['problem_types'])}"
+                    by_problem = summary["by_problem"].setdefault(key, {"correct": 0, "total": 0})
+                    by_problem["correct"] += correct
+                    by_problem["total"] += 1
+                    summary["correct"] += correct
+                    summary["total"] += 1
+                    summary["missing"] += response is None
+
+                    if results_file is not None:
+                        results_file.write(json.dumps({"id": problem_id, "problem_name": problem["problem_name"], "correct": correct}) + "\n")
+
+                progress.update(len(batch))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        if results_file is not None:
+            results_file.close()
+
+    summary["accuracy"] = summary["correct"] / summary["total"] if summary["total"] else 0.0
+    for by_problem in summary["by_problem"].values():
+        by_problem["accuracy"] = by_problem["correct"] / by_problem["total"]
+
+    return summary
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Score model responses to a DINOS benchmark.")
+    parser.add_argument('--benchmark', type=str, help='Benchmark file created by benchmark.dinos', required=True)
+    parser.add_argument('--responses', type=str, help='.jsonl file with one {"id": ..., "response": ...} object per line', required=True)
+    parser.add_argument('--results', type=str, help='Optional .jsonl file to write whether each response was correct to', default=None)
+    parser.add_argument('--output', type=str, help='File to write the score summary to, stdout if not given', default=None)
+    parser.add_argument('--workers', type=int, help='Number of processes used to grade responses', default=1)
+
+    args = parser.parse_args()
+
+    summary = score(args.benchmark, args.responses, results_path=args.results, workers=args.workers)
+
+    if args.output is None:
+        json.dump(summary, sys.stdout, indent=4)
+        print()
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=4)
+
+if __name__ == '__main__':
+    main()
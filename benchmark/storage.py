@@ -0,0 +1,298 @@
+import gzip
+import json
+import lzma
+import mmap
+import os
+import struct
+from array import array
+from typing import IO, Iterator
+
+
+COMPRESSION_OPENERS: dict = {
+    ".gz": gzip.open,
+    ".xz": lzma.open
+}
+
+
+def split_compression(path: str) -> tuple[str, str | None]:
+    root, extension = os.path.splitext(path)
+    if extension in COMPRESSION_OPENERS:
+        return root, extension
+    return path, None
+
+def is_jsonl(path: str) -> bool:
+    return os.path.splitext(split_compression(path)[0])[1] == ".jsonl"
+
+def is_dinos(path: str) -> bool:
+    return os.path.splitext(path)[1] == ".dinos"
+
+def shard_indices(num_problems: int, shard: tuple[int, int] | None = None) -> range:
+    # Shards own consecutive indices, so their outputs concatenated in shard order are the whole benchmark
+    if shard is None:
+        return range(num_problems)
+    shard_index, num_shards = shard
+    return range(num_problems * shard_index // num_shards, num_problems * (shard_index + 1) // num_shards)
+
+def header_indices(header: dict) -> range:
+    # Indices of the problems a benchmark file with this header holds
+    return shard_indices(header["num_problems"], header.get("shard"))
+
+def open_text(path: str, mode: str = "r") -> IO[str]:
+    _, compression = split_compression(path)
+    if compression is None:
+        return open(path, mode, encoding="utf-8")
+    return COMPRESSION_OPENERS[compression](path, mode + "t", encoding="utf-8")
+
+def _open_binary(path: str, mode: str = "rb") -> IO[bytes]:
+    _, compression = split_compression(path)
+    return COMPRESSION_OPENERS.get(compression, open)(path, mode)
+
+def _iter_complete_records(path: str) -> Iterator[tuple[bytes, dict]]:
+    # Stops at the first record that was only partially written, e.g. after a crash
+    with _open_binary(path) as f:
+        try:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    return
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    return
+                yield line, record
+        except (EOFError, OSError, lzma.LZMAError):
+            return  # Truncated compressed stream
+
+def _iter_complete_lines(path: str) -> Iterator[bytes]:
+    for line, _ in _iter_complete_records(path):
+        yield line
+
+def iter_jsonl(path: str) -> Iterator[dict]:
+    for _, record in _iter_complete_records(path):
+        yield record
+
+def read_jsonl_header(path: str) -> dict | None:
+    for header in iter_jsonl(path):
+        return header
+    return None
+
+
+class JsonlBenchmarkWriter:
+    # One header line with the generation parameters, then one problem per line
+    def __init__(self, path: str, header: dict, resume: bool = False, checkpoint_interval: int = 1000) -> None:
+        self.path: str = path
+        self.header: dict = header
+        self.checkpoint_interval: int = checkpoint_interval
+        self.compression: str | None = split_compression(path)[1]
+        self.num_records: int = 0
+
+        self.file: IO[str]
+        if resume and os.path.exists(path):
+            self._recover()
+            self.file = open_text(path, "a")
+        else:
+            self.file = open_text(path, "w")
+            self.file.write(json.dumps(header) + "\n")
+
+    def _recover(self) -> None:
+        lines = _iter_complete_lines(self.path)
+        header_line = next(lines, b"null\n")
+        existing_header = json.loads(header_line)
+        if existing_header != self.header:
+            raise ValueError(f"Cannot resume '{self.path}': it was generated with {existing_header}, not {self.header}")
+
+        valid_length = len(header_line)
+        if self.compression is None:
+            for line in lines:
+                valid_length += len(line)
+                self.num_records += 1
+            os.truncate(self.path, valid_length)
+        else:
+            # Compressed streams can't be truncated in place, so the complete records are copied to a fresh file
+            temp_path = self.path + ".tmp"
+            with COMPRESSION_OPENERS[self.compression](temp_path, "wb") as f:
+                f.write(header_line)
+                for line in lines:
+                    f.write(line)
+                    self.num_records += 1
+            os.replace(temp_path, self.path)
+
+    def _checkpoint(self) -> None:
+        if self.compression is None:
+            self.file.flush()
+        else:
+            # Closing ends the compressed member, so everything written so far survives a crash
+            self.file.close()
+            self.file = open_text(self.path, "a")
+
+    def write(self, problem_key: str, problem: dict) -> None:
+        self.file.write(json.dumps({"id": problem_key, **problem}) + "\n")
+        self.num_records += 1
+
+        if self.num_records % self.checkpoint_interval == 0:
+            self._checkpoint()
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self) -> "JsonlBenchmarkWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class JsonBenchmarkWriter:
+    # Streams the same bytes as json.dump({"seed": ..., "problems": {...}}, f, indent=4).
+    # The file is written to path + ".tmp" and only moved to path once it is complete, since a .json benchmark cut
+    # short would otherwise still load as a valid, smaller one.
+    def __init__(self, path: str, header: dict, resume: bool = False) -> None:
+        if resume:
+            raise ValueError("Resuming is only supported for .jsonl output files")
+
+        self.path: str = path
+        self.temp_path: str = path + ".tmp"
+        self.num_records: int = 0
+        self.file: IO[str] = open_text(self.temp_path, "w")
+        self.file.write('{\n    "seed": ' + json.dumps(header["seed"]) + ',\n    "problems": {')
+
+    def write(self, problem_key: str, problem: dict) -> None:
+        separator = ",\n" if self.num_records else "\n"
+        self.file.write(separator + "        " + json.dumps(problem_key) + ": " + json.dumps(problem, indent=4).replace("\n", "\n        "))
+        self.num_records += 1
+
+    def close(self) -> None:
+        self.file.write("\n    }\n}" if self.num_records else "}\n}")
+        self.file.close()
+        os.replace(self.temp_path, self.path)
+
+    def __enter__(self) -> "JsonBenchmarkWriter":
+        return self
+
+    def __exit__(self, exception_type, *args) -> None:
+        if exception_type is not None:
+            self.file.close()  # Left unterminated at the temporary path
+            return
+        self.close()
+
+
+# .dinos layout, all integers little endian:
+#   magic, u64 header length, header JSON
+#   per record: u32 length, record JSON
+#   index: u64 offset of each record's length prefix
+#   footer: u64 index offset, u64 number of records, end magic
+DINOS_MAGIC: bytes = b"DINOS\x00\x01\x00"
+DINOS_END_MAGIC: bytes = b"DINOSEND"
+_U32: struct.Struct = struct.Struct("<I")
+_U64: struct.Struct = struct.Struct("<Q")
+_FOOTER: struct.Struct = struct.Struct("<QQ8s")
+
+
+class DinosBenchmarkWriter:
+    # Record offsets are kept in memory, 8 bytes per problem, and written as the index on close
+    def __init__(self, path: str, header: dict, resume: bool = False) -> None:
+        if resume:
+            raise ValueError("Resuming is only supported for .jsonl output files")
+
+        self.path: str = path
+        self.num_records: int = 0
+        self.offsets: array = array("Q")
+        self.file: IO[bytes] = open(path, "wb")
+
+        header_bytes = json.dumps(header).encode("utf-8")
+        self.file.write(DINOS_MAGIC + _U64.pack(len(header_bytes)) + header_bytes)
+        self.position: int = len(DINOS_MAGIC) + _U64.size + len(header_bytes)
+
+    def write(self, problem_key: str, problem: dict) -> None:
+        record = json.dumps({"id": problem_key, **problem}).encode("utf-8")
+        self.offsets.append(self.position)
+        self.file.write(_U32.pack(len(record)) + record)
+        self.position += _U32.size + len(record)
+        self.num_records += 1
+
+    def close(self) -> None:
+        if self.offsets.itemsize != 8:
+            raise ValueError("The offset index needs 8 byte unsigned integers")
+        if struct.pack("=H", 1) != struct.pack("<H", 1):
+            self.offsets.byteswap()
+
+        self.file.write(self.offsets.tobytes())
+        self.file.write(_FOOTER.pack(self.position, self.num_records, DINOS_END_MAGIC))
+        self.file.close()
+
+    def __enter__(self) -> "DinosBenchmarkWriter":
+        return self
+
+    def __exit__(self, exception_type, *args) -> None:
+        if exception_type is not None:
+            # Without the index and footer, the reader rejects the file as incomplete instead of opening the problems
+            # written before the error as the whole benchmark
+            self.file.close()
+            return
+        self.close()
+
+
+class DinosBenchmarkReader:
+    # Opening only reads the header and footer, every problem is decoded on access straight from the shared mapping
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        with open(path, "rb") as f:
+            self.mmap: mmap.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self.mmap[:len(DINOS_MAGIC)] != DINOS_MAGIC:
+            raise ValueError(f"'{path}' is not a .dinos file")
+        if len(self.mmap) < len(DINOS_MAGIC) + _U64.size + _FOOTER.size:
+            raise ValueError(f"'{path}' is incomplete, it has no index")
+        index_offset, self.num_records, end_magic = _FOOTER.unpack_from(self.mmap, len(self.mmap) - _FOOTER.size)
+        if end_magic != DINOS_END_MAGIC:
+            raise ValueError(f"'{path}' is incomplete, it has no index")
+
+        self.index_offset: int = index_offset
+        header_length = _U64.unpack_from(self.mmap, len(DINOS_MAGIC))[0]
+        header_start = len(DINOS_MAGIC) + _U64.size
+        self.header: dict = json.loads(self.mmap[header_start:header_start + header_length])
+
+        # A run that was stopped without an error still writes the index, but not every problem the header promises
+        if "num_problems" in self.header:
+            num_expected = len(header_indices(self.header))
+            if self.num_records != num_expected:
+                raise ValueError(f"'{path}' is incomplete, it has {self.num_records} of its {num_expected} problems")
+
+    def __len__(self) -> int:
+        return self.num_records
+
+    def raw(self, index: int) -> memoryview:
+        # The JSON bytes of one record without copying them
+        if not 0 <= index < self.num_records:
+            raise IndexError(f"Problem {index} is out of range for {self.num_records} problems")
+        offset = _U64.unpack_from(self.mmap, self.index_offset + index * _U64.size)[0]
+        length = _U32.unpack_from(self.mmap, offset)[0]
+        return memoryview(self.mmap)[offset + _U32.size:offset + _U32.size + length]
+
+    def __getitem__(self, index: int | slice) -> dict | list[dict]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.num_records))]
+        if index < 0:
+            index += self.num_records
+        with self.raw(index) as record:
+            return json.loads(bytes(record))
+
+    def __iter__(self) -> Iterator[dict]:
+        for i in range(self.num_records):
+            yield self[i]
+
+    def close(self) -> None:
+        self.mmap.close()
+
+    def __enter__(self) -> "DinosBenchmarkReader":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def open_benchmark_writer(path: str, header: dict, resume: bool = False) -> JsonlBenchmarkWriter | JsonBenchmarkWriter | DinosBenchmarkWriter:
+    if is_jsonl(path):
+        return JsonlBenchmarkWriter(path, header, resume=resume)
+    if is_dinos(path):
+        return DinosBenchmarkWriter(path, header, resume=resume)
+    return JsonBenchmarkWriter(path, header, resume=resume)
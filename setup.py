@@ -1,2 +1,2 @@
 from setuptools import setup, find_packages
-setup(name = "DINOS", version = "1.0",  packages = find_packages())
\ No newline at end of file
+setup(name = "DINOS", version = "1.0",  packages = find_packages(), extras_require = {"batch": ["numpy"]})
\ No newline at end of file
@@ -0,0 +1,38 @@
+import random
+
+import pytest
+
+from benchmark.problems.dyck_language_problem import generate_dyck_word
+
+
+PARENS: list[tuple[str, str]] = [("(", ")"), ("[", "]"), ("{", "}"), ("<", ">")]
+
+
+def recursive_dyck_word(rng: random.Random, num_pairs: int) -> str:
+    # The recursive definition generate_dyck_word replaced
+    if num_pairs == 0:
+        return ""
+    split = rng.randint(0, num_pairs - 1)
+    left = recursive_dyck_word(rng, split)
+    right = recursive_dyck_word(rng, num_pairs - split - 1)
+    paren = rng.choice(PARENS)
+    return f"{paren[0]}{left}{right}{paren[1]}"
+
+def recursive_split_index(word: str) -> int:
+    last_start_index = -1
+    for i, char in enumerate(word):
+        if char in "([{<":
+            last_start_index = i
+    return last_start_index + 1 if last_start_index != -1 else len(word) // 2
+
+
+@pytest.mark.parametrize("num_pairs", [0, 1, 2, 5, 17, 100])
+def test_matches_recursive_baseline(num_pairs):
+    for seed in range(200):
+        rng, expected_rng = random.Random(seed), random.Random(seed)
+        word, split_index = generate_dyck_word(rng, num_pairs, PARENS)
+        expected = recursive_dyck_word(expected_rng, num_pairs)
+
+        assert word == expected
+        assert split_index == recursive_split_index(expected)
+        assert rng.getstate() == expected_rng.getstate()
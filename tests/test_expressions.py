@@ -0,0 +1,35 @@
+import pytest
+
+from benchmark.config import Config
+from benchmark.expressions import evaluate
+from benchmark.problems.boolean_expression_problem import BooleanExpressionResponseProblem
+from benchmark.problems.math_expression_problem import MathExpressionResponseProblem
+
+
+@pytest.mark.parametrize("parameters", [{}, {"min_depth": 3, "max_depth": 4, "max_sub_expressions": 5}])
+def test_math_expressions_match_eval(parameters):
+    for seed in range(300):
+        problem = MathExpressionResponseProblem(config=Config(seed=seed))
+        problem.generate(**parameters)
+
+        assert evaluate(problem.expression) == problem.expression.value == eval(problem.problem)
+        assert problem.answer == str(eval(problem.problem))
+
+@pytest.mark.parametrize("parameters", [{}, {"min_depth": 5, "max_depth": 6}])
+def test_boolean_expressions_match_eval(parameters):
+    for seed in range(300):
+        problem = BooleanExpressionResponseProblem(config=Config(seed=seed))
+        problem.generate(**parameters)
+
+        assert evaluate(problem.expression) == problem.expression.value == eval(problem.problem)
+        assert problem.answer == str(eval(problem.problem))
+
+@pytest.mark.parametrize("max_nodes", [10, 40, 200])
+def test_budgeted_boolean_expressions_match_eval(max_nodes):
+    for seed in range(300):
+        problem = BooleanExpressionResponseProblem(config=Config(seed=seed))
+        problem.generate(min_depth=8, max_depth=10, max_nodes=max_nodes)
+
+        assert problem.expression.size() <= max_nodes
+        assert evaluate(problem.expression) == problem.expression.value == eval(problem.problem)
+        assert problem.answer == str(eval(problem.problem))
@@ -0,0 +1,59 @@
+import random
+from itertools import permutations
+
+import pytest
+
+from benchmark.config import Config
+from benchmark.problems.logical_deduction_n_people_problem import LogicalDeductionNPeopleResponseProblem, solve_arrangements
+
+
+def brute_force_arrangements(num_people: int, constraints: list[tuple]) -> list[list[int]]:
+    # Every assignment of positions to people that satisfies the constraints, by trying all of them
+    arrangements = []
+    for positions in permutations(range(num_people)):
+        if all(satisfies(positions, constraint) for constraint in constraints):
+            arrangements.append(list(positions))
+    return arrangements
+
+def satisfies(positions: tuple[int, ...], constraint: tuple) -> bool:
+    if constraint[0] == "position":
+        return positions[constraint[1]] == constraint[2]
+    if constraint[0] == "order":
+        return positions[constraint[1]] < positions[constraint[2]]
+    return positions[constraint[1]] < positions[constraint[2]] < positions[constraint[3]]
+
+def random_constraints(rng: random.Random, num_people: int) -> list[tuple]:
+    constraints = []
+    for _ in range(rng.randint(0, num_people + 2)):
+        kind = rng.choice(["position", "order", "between"])
+        if kind == "position":
+            constraints.append(("position", rng.randrange(num_people), rng.randrange(num_people)))
+        elif kind == "order" or num_people < 3:
+            constraints.append(("order", *rng.sample(range(num_people), 2)))
+        else:
+            constraints.append(("between", *rng.sample(range(num_people), 3)))
+    return constraints
+
+
+@pytest.mark.parametrize("num_people", range(2, 7))
+def test_solver_matches_brute_force(num_people):
+    rng = random.Random(num_people)
+    for _ in range(300):
+        constraints = random_constraints(rng, num_people)
+        expected = brute_force_arrangements(num_people, constraints)
+
+        solved = solve_arrangements(num_people, constraints, limit=len(expected) + 1)
+        assert sorted(solved) == sorted(expected), constraints
+
+        # Generation only asks whether there is more than one
+        assert len(solve_arrangements(num_people, constraints)) == min(2, len(expected)), constraints
+
+@pytest.mark.parametrize("num_people", [3, 5, 7])
+def test_generated_problems_have_one_arrangement(num_people):
+    for seed in range(30):
+        problem = LogicalDeductionNPeopleResponseProblem(config=Config(seed=seed))
+        problem.generate(num_people=num_people)
+
+        arrangements = brute_force_arrangements(num_people, problem.constraints)
+        assert arrangements == [list(range(num_people))]
+        assert problem.answer == problem.names.index(problem.unmentioned_person) + 1
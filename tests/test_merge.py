@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from benchmark.dinos import write_benchmark
+from benchmark.merge import merge_shards
+
+
+SEED: int = 7
+NUM_PROBLEMS: int = 60
+
+
+def read_bytes(path) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+def write_shards(tmp_path, num_shards: int = 3, suffix: str = ".jsonl", **options) -> list[str]:
+    shard_paths = []
+    for shard_index in range(num_shards):
+        shard_paths.append(str(tmp_path / f"shard{shard_index}{suffix}"))
+        write_benchmark(shard_paths[-1], seed=SEED, num_problems=NUM_PROBLEMS, num_shots=1, shard=(shard_index, num_shards), **options)
+    return shard_paths
+
+def edit_lines(path: str, edit) -> None:
+    with open(path) as f:
+        lines = [json.loads(line) for line in f]
+    with open(path, 'w') as f:
+        f.writelines(json.dumps(line) + "\n" for line in edit(lines))
+
+
+@pytest.mark.parametrize("suffix", [".json", ".jsonl", ".dinos"])
+def test_merged_shards_match_single_run(tmp_path, suffix):
+    write_benchmark(str(tmp_path / ("single" + suffix)), seed=SEED, num_problems=NUM_PROBLEMS, num_shots=1)
+    shard_paths = write_shards(tmp_path, suffix=".dinos" if suffix == ".dinos" else ".jsonl")
+
+    assert merge_shards(list(reversed(shard_paths)), str(tmp_path / ("merged" + suffix)), num_verify=5) == NUM_PROBLEMS
+    assert read_bytes(tmp_path / ("merged" + suffix)) == read_bytes(tmp_path / ("single" + suffix))
+
+def test_missing_and_repeated_shards_are_rejected(tmp_path):
+    shard_paths = write_shards(tmp_path)
+
+    with pytest.raises(ValueError, match="Missing shards 1 of 3"):
+        merge_shards([shard_paths[0], shard_paths[2]], str(tmp_path / "merged.jsonl"))
+    with pytest.raises(ValueError, match="are both shard 0"):
+        merge_shards([shard_paths[0], shard_paths[0], shard_paths[1], shard_paths[2]], str(tmp_path / "merged.jsonl"))
+    with pytest.raises(ValueError, match="No shards"):
+        merge_shards([], str(tmp_path / "merged.jsonl"))
+
+def test_shards_of_other_settings_are_rejected(tmp_path):
+    shard_paths = write_shards(tmp_path)
+    write_benchmark(str(tmp_path / "other.jsonl"), seed=SEED + 1, num_problems=NUM_PROBLEMS, num_shots=1, shard=(1, 3))
+    write_benchmark(str(tmp_path / "whole.jsonl"), seed=SEED, num_problems=NUM_PROBLEMS, num_shots=1)
+
+    with pytest.raises(ValueError, match="same settings"):
+        merge_shards([shard_paths[0], str(tmp_path / "other.jsonl"), shard_paths[2]], str(tmp_path / "merged.jsonl"))
+    with pytest.raises(ValueError, match="has no shard"):
+        merge_shards([str(tmp_path / "whole.jsonl")], str(tmp_path / "merged.jsonl"))
+
+def test_shards_missing_or_adding_problems_are_rejected(tmp_path):
+    shard_paths = write_shards(tmp_path)
+
+    edit_lines(shard_paths[1], lambda lines: lines[:-1])
+    with pytest.raises(ValueError, match="ends before problem 39"):
+        merge_shards(shard_paths, str(tmp_path / "merged.jsonl"))
+
+    edit_lines(shard_paths[1], lambda lines: lines + [dict(lines[-1], id="39"), dict(lines[-1], id="40")])
+    with pytest.raises(ValueError, match="has problem 40 after the last problem of shard 1"):
+        merge_shards(shard_paths, str(tmp_path / "merged.jsonl"))
+
+    edit_lines(shard_paths[1], lambda lines: lines[:1] + lines[2:])
+    with pytest.raises(ValueError, match="has problem 21 where shard 1 should have problem 20"):
+        merge_shards(shard_paths, str(tmp_path / "merged.jsonl"))
+
+def test_verify_catches_changed_problems(tmp_path):
+    shard_paths = write_shards(tmp_path)
+
+    edit_lines(shard_paths[0], lambda lines: lines[:1] + [dict(lines[1], prompt="Changed")] + lines[2:])
+    merge_shards(shard_paths, str(tmp_path / "unverified.jsonl"))
+    with pytest.raises(ValueError, match="Problem 0 .* differs"):
+        merge_shards(shard_paths, str(tmp_path / "merged.jsonl"), num_verify=NUM_PROBLEMS)
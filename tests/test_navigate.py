@@ -0,0 +1,44 @@
+import pytest
+
+from benchmark import dinos
+from benchmark.config import Config
+from benchmark.dinos import generate_chunk, generate_record
+from benchmark.problems import navigate_problem
+from benchmark.problems.navigate_problem import NavigateResponseProblem
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.mark.parametrize("parameters", [{}, {"min_num_steps": 0, "max_num_steps": 3}, {"min_num_steps": 20, "max_num_steps": 40, "min_distance": 3, "max_distance": 100}])
+def test_batch_matches_generate(parameters):
+    seeds = list(range(1000)) + [2 ** 32 + 5, 2 ** 40 + 7, 10 ** 30]
+    batch = NavigateResponseProblem.generate_batch(seeds, **parameters)
+    assert all(draws is not None for draws in batch)
+
+    for seed, draws in zip(seeds, batch):
+        expected = NavigateResponseProblem(config=Config(seed=seed - 1))
+        expected.generate(**parameters)
+
+        problem = NavigateResponseProblem(config=Config(seed=seed - 1))
+        problem.generate(**parameters, draws=draws)
+        assert (problem.actions, problem.position, problem.problem, problem.answer) == (expected.actions, expected.position, expected.problem, expected.answer)
+        assert problem.config.rng.getstate() == expected.config.rng.getstate()
+
+def test_generation_falls_back_when_batch_differs(monkeypatch):
+    expected = generate_chunk(Config(seed=3), 3, range(600), [NavigateResponseProblem])
+
+    # Stands in for a Python whose random module no longer draws like generate_batch assumes
+    monkeypatch.setattr(navigate_problem, "python_random_words", lambda seeds, num_words: np.zeros((len(seeds), num_words), dtype=np.uint32))
+    monkeypatch.setattr(dinos, "_batch_checks", {})
+    monkeypatch.setattr(dinos, "MIN_BATCH_SIZE", 1)
+    with pytest.warns(UserWarning, match="generated one by one"):
+        assert generate_chunk(Config(seed=3), 3, range(600), [NavigateResponseProblem]) == expected
+    assert dinos._batch_checks == {(NavigateResponseProblem, "{}"): False}
+
+def test_generation_uses_checked_batch(monkeypatch):
+    monkeypatch.setattr(dinos, "_batch_checks", {})
+    monkeypatch.setattr(dinos, "MIN_BATCH_SIZE", 1)
+
+    batched = generate_chunk(Config(seed=3), 3, range(600), [NavigateResponseProblem])
+    assert dinos._batch_checks == {(NavigateResponseProblem, "{}"): True}
+    assert batched == [generate_record(Config(seed=3), 3, index, [NavigateResponseProblem]) for index in range(600)]
@@ -0,0 +1,18 @@
+from benchmark.dinos import write_benchmark
+from benchmark.render import render_benchmark
+from benchmark.scoring import iter_benchmark
+
+
+def test_rendered_states_match_generation(tmp_path):
+    write_benchmark(str(tmp_path / "benchmark.jsonl"), seed=7, num_problems=60, num_shots=1, state_path=str(tmp_path / "state.jsonl"))
+    render_benchmark(str(tmp_path / "state.jsonl"), str(tmp_path / "rendered.jsonl"))
+
+    assert list(iter_benchmark(str(tmp_path / "rendered.jsonl"))) == list(iter_benchmark(str(tmp_path / "benchmark.jsonl")))
+
+def test_unchanged_templates_are_copied(tmp_path):
+    write_benchmark(str(tmp_path / "benchmark.jsonl"), seed=7, num_problems=60, num_shots=1, state_path=str(tmp_path / "state.jsonl"))
+    render_benchmark(str(tmp_path / "state.jsonl"), str(tmp_path / "first.jsonl"))
+    num_rendered, num_copied = render_benchmark(str(tmp_path / "state.jsonl"), str(tmp_path / "second.jsonl"), previous_path=str(tmp_path / "first.jsonl"))
+
+    assert (num_rendered, num_copied) == (0, 60)
+    assert list(iter_benchmark(str(tmp_path / "second.jsonl"))) == list(iter_benchmark(str(tmp_path / "benchmark.jsonl")))
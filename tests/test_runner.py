@@ -0,0 +1,56 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from benchmark.dinos import write_benchmark
+from benchmark.mock_server import MockModelHandler, create_server
+from benchmark.runner import ModelClient, RequestError, run_benchmark
+from benchmark.scoring import score
+
+
+class DroppingHandler(MockModelHandler):
+    # Leaves out the choice of the last prompt of every completions request while server.drop_choices is set
+    def _send_json(self, status: int, data: dict) -> None:
+        if self.server.drop_choices and data.get("object") == "text_completion":
+            data = dict(data, choices=data["choices"][:-1])
+        super()._send_json(status, data)
+
+
+@pytest.fixture
+def server(tmp_path):
+    write_benchmark(str(tmp_path / "benchmark.jsonl"), seed=7, num_problems=20)
+    server = create_server(port=0, benchmark_path=str(tmp_path / "benchmark.jsonl"))
+    server.RequestHandlerClass = DroppingHandler
+    server.drop_choices = False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def client_for(server, endpoint: str = "completions") -> ModelClient:
+    return ModelClient(f"http://127.0.0.1:{server.server_address[1]}/v1", "mock", endpoint=endpoint)
+
+
+def test_missing_choice_is_an_error(server):
+    server.drop_choices = True
+    with pytest.raises(RequestError, match="missing choices for prompts 1 of 2") as error:
+        client_for(server).complete(["first", "second"])
+    assert not error.value.retryable
+
+def test_failed_requests_are_retried_on_resume(server, tmp_path):
+    benchmark_path, responses_path = str(tmp_path / "benchmark.jsonl"), str(tmp_path / "responses.jsonl")
+    server.drop_choices = True
+    asyncio.run(run_benchmark(benchmark_path, responses_path, client_for(server), concurrency=2, batch_size=4))
+
+    with open(responses_path) as f:
+        records = [json.loads(line) for line in f]
+    assert len(records) == 20 and all("error" in record for record in records)
+
+    server.drop_choices = False
+    asyncio.run(run_benchmark(benchmark_path, responses_path, client_for(server), concurrency=2, batch_size=4, resume=True))
+
+    summary = score(benchmark_path, responses_path)
+    assert (summary["total"], summary["missing"], summary["correct"]) == (20, 0, 20)
@@ -0,0 +1,55 @@
+import json
+import random
+
+import pytest
+
+from benchmark.scoring import grade, join_responses, score
+from utils.problem_type import ProblemType
+
+
+def shuffled_responses(num_problems: int, seed: int = 1) -> list[tuple[str, str]]:
+    # Responses for all but every seventh problem, in random order, with a second response for a few ids
+    rng = random.Random(seed)
+    responses = [(str(i), f"first {i}") for i in range(num_problems) if i % 7]
+    rng.shuffle(responses)
+    positions = rng.sample(range(len(responses)), 20)
+    for position in sorted(positions, reverse=True):
+        response_id, _ = responses[position]
+        responses.insert(rng.randint(position + 1, len(responses)), (response_id, f"second {response_id}"))
+    return responses
+
+
+@pytest.mark.parametrize("max_pending", [1, 10, 100, 100000])
+def test_join_is_the_same_in_memory_and_on_disk(max_pending):
+    problems = [(str(i), {}) for i in range(2000)]
+    joined = list(join_responses(iter(problems), iter(shuffled_responses(2000)), max_pending=max_pending))
+
+    assert [problem_id for problem_id, _, _ in joined] == [problem_id for problem_id, _ in problems]
+    assert [response for _, _, response in joined] == [None if i % 7 == 0 else f"first {i}" for i in range(2000)]
+
+def test_in_order_responses_stay_in_memory():
+    problems = [(str(i), {}) for i in range(1000)]
+    responses = [(str(i), str(i)) for i in range(1000)]
+
+    assert [response for _, _, response in join_responses(iter(problems), iter(responses), max_pending=1)] == [str(i) for i in range(1000)]
+
+def test_lines_with_errors_are_skipped(tmp_path):
+    with open(tmp_path / "benchmark.jsonl", 'w') as f:
+        f.write(json.dumps({"seed": 0, "num_problems": 2}) + "\n")
+        for i, answer in enumerate(["True", "(1, 2)"]):
+            f.write(json.dumps({"id": str(i), "problem_name": ["liar_problem", "navigate_problem"][i], "problem_types": [], "answer": answer}) + "\n")
+    with open(tmp_path / "responses.jsonl", 'w') as f:
+        f.write(json.dumps({"id": "0", "response": None, "error": "HTTP 503"}) + "\n")
+        f.write(json.dumps({"id": "1", "response": "(1,2)."}) + "\n")
+        f.write(json.dumps({"id": "0", "response": "true"}) + "\n")
+
+    summary = score(str(tmp_path / "benchmark.jsonl"), str(tmp_path / "responses.jsonl"))
+    assert (summary["correct"], summary["total"], summary["missing"]) == (2, 2, 0)
+
+def test_grade_normalizes_answers():
+    assert grade("math_expression_problem", [], "-1200", " -1,200.")
+    assert grade("people_sorting_problem", [], "Ann, Bob", "Ann Bob")
+    assert grade("dyck_language_problem", [], ")]", ") ]")
+    assert grade("navigate_problem", [str(ProblemType.MULTIPLE_CHOICE)], "B", "(B)")
+    assert not grade("liar_problem", [], "True", None)
+    assert not grade("liar_problem", [], "True", "false")
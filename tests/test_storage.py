@@ -0,0 +1,136 @@
+import json
+import os
+
+import pytest
+
+from benchmark.dinos import generate_benchmark, save_benchmark, write_benchmark
+from benchmark.scoring import iter_benchmark
+from benchmark.storage import DinosBenchmarkReader, DinosBenchmarkWriter, JsonBenchmarkWriter, JsonlBenchmarkWriter, iter_jsonl, open_text
+
+
+HEADER: dict = {"seed": 7, "num_problems": 10}
+
+
+def write_records(path, header: dict, num_records: int) -> None:
+    with DinosBenchmarkWriter(str(path), header) as writer:
+        for i in range(num_records):
+            writer.write(str(i), {"prompt": f"problem {i}"})
+
+
+def test_dinos_reader_reads_what_was_written(tmp_path):
+    write_records(tmp_path / "benchmark.dinos", HEADER, 10)
+
+    with DinosBenchmarkReader(str(tmp_path / "benchmark.dinos")) as reader:
+        assert reader.header == HEADER
+        assert len(reader) == 10
+        assert reader[3] == {"id": "3", "prompt": "problem 3"}
+        assert reader[-1]["id"] == "9"
+        assert [record["id"] for record in reader[2:5]] == ["2", "3", "4"]
+        with pytest.raises(IndexError):
+            reader.raw(10)
+
+def test_dinos_matches_jsonl(tmp_path):
+    write_benchmark(str(tmp_path / "benchmark.jsonl"), seed=7, num_problems=60, num_shots=1)
+    write_benchmark(str(tmp_path / "benchmark.dinos"), seed=7, num_problems=60, num_shots=1)
+
+    assert list(iter_benchmark(str(tmp_path / "benchmark.dinos"))) == list(iter_benchmark(str(tmp_path / "benchmark.jsonl")))
+
+def test_dinos_written_until_an_error_is_incomplete(tmp_path):
+    path = tmp_path / "benchmark.dinos"
+    with pytest.raises(RuntimeError):
+        with DinosBenchmarkWriter(str(path), HEADER) as writer:
+            writer.write("0", {"prompt": "problem 0"})
+            raise RuntimeError("Stopped")
+
+    with pytest.raises(ValueError, match="incomplete"):
+        DinosBenchmarkReader(str(path))
+
+def test_dinos_with_fewer_problems_than_its_header_is_incomplete(tmp_path):
+    write_records(tmp_path / "benchmark.dinos", HEADER, 1)
+
+    with pytest.raises(ValueError, match="1 of its 10 problems"):
+        DinosBenchmarkReader(str(tmp_path / "benchmark.dinos"))
+
+def test_dinos_shard_holds_its_range(tmp_path):
+    # Shard 1 of 3 of 10 problems owns indices 3 to 5
+    write_records(tmp_path / "shard.dinos", dict(HEADER, shard=[1, 3]), 3)
+    with DinosBenchmarkReader(str(tmp_path / "shard.dinos")) as reader:
+        assert len(reader) == 3
+
+    write_records(tmp_path / "short.dinos", dict(HEADER, shard=[1, 3]), 2)
+    with pytest.raises(ValueError, match="2 of its 3 problems"):
+        DinosBenchmarkReader(str(tmp_path / "short.dinos"))
+
+def test_truncated_dinos_is_incomplete(tmp_path):
+    path = tmp_path / "benchmark.dinos"
+    write_records(path, HEADER, 10)
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    for length in (len(data) - 1, 30, 12):
+        with open(path, 'wb') as f:
+            f.write(data[:length])
+        with pytest.raises(ValueError, match="incomplete"):
+            DinosBenchmarkReader(str(path))
+
+def read_bytes(path) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+def test_streamed_json_matches_json_dump(tmp_path):
+    save_benchmark(generate_benchmark(seed=7, num_problems=60, num_shots=1), tmp_path / "dumped.json")
+    write_benchmark(str(tmp_path / "streamed.json"), seed=7, num_problems=60, num_shots=1)
+
+    assert read_bytes(tmp_path / "streamed.json") == read_bytes(tmp_path / "dumped.json")
+    assert not os.path.exists(tmp_path / "streamed.json.tmp")
+
+def test_json_written_until_an_error_is_not_moved_into_place(tmp_path):
+    path = tmp_path / "benchmark.json"
+    with pytest.raises(RuntimeError):
+        with JsonBenchmarkWriter(str(path), HEADER) as writer:
+            writer.write("0", {"prompt": "problem 0"})
+            raise RuntimeError("Stopped")
+
+    assert not os.path.exists(path)
+    with pytest.raises(json.JSONDecodeError):
+        with open(str(path) + ".tmp") as f:
+            json.load(f)
+
+@pytest.mark.parametrize("suffix", [".jsonl", ".jsonl.gz", ".jsonl.xz"])
+def test_resumed_output_matches_single_run(tmp_path, suffix):
+    expected_path, path = str(tmp_path / ("expected" + suffix)), str(tmp_path / ("resumed" + suffix))
+    write_benchmark(expected_path, seed=7, num_problems=60)
+
+    # A run stopped part way through writing a record
+    expected = read_bytes(expected_path)
+    with open(path, 'wb') as f:
+        f.write(expected[:len(expected) * 3 // 5])
+
+    write_benchmark(path, seed=7, num_problems=60, resume=True)
+    assert list(iter_benchmark(path)) == list(iter_benchmark(expected_path))
+    if suffix == ".jsonl":
+        assert read_bytes(path) == expected
+
+@pytest.mark.parametrize("suffix", [".jsonl", ".jsonl.gz"])
+def test_resume_drops_the_partial_record(tmp_path, suffix):
+    path = str(tmp_path / ("benchmark" + suffix))
+    with JsonlBenchmarkWriter(path, HEADER, checkpoint_interval=2) as writer:
+        for i in range(5):
+            writer.write(str(i), {"prompt": f"problem {i}"})
+    with open_text(path, "a") as f:
+        f.write('{"id": "5", "prompt": "probl')
+
+    with JsonlBenchmarkWriter(path, HEADER, resume=True) as writer:
+        assert writer.num_records == 5
+        writer.write("5", {"prompt": "problem 5"})
+
+    assert [record.get("id") for record in iter_jsonl(path)] == [None, "0", "1", "2", "3", "4", "5"]
+
+def test_resume_rejects_other_settings(tmp_path):
+    path = str(tmp_path / "benchmark.jsonl")
+    write_benchmark(path, seed=7, num_problems=20)
+
+    with pytest.raises(ValueError, match="Cannot resume"):
+        write_benchmark(path, seed=8, num_problems=20, resume=True)
+    with pytest.raises(ValueError, match="requires a .jsonl"):
+        write_benchmark(str(tmp_path / "benchmark.json"), seed=7, num_problems=20, resume=True)
@@ -0,0 +1,132 @@
+import json
+import os
+from collections.abc import Sequence
+from types import MappingProxyType
+from typing import Callable, Iterable
+
+
+NAMES_PATH: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "names.json")
+
+# Synthetic names are built from consonant-vowel syllables, e.g. "Kavelo"
+SYLLABLE_CONSONANTS: str = "bdfgklmnprstvz"
+SYLLABLE_VOWELS: str = "aeiou"
+SYLLABLES: tuple[str, ...] = tuple(consonant + vowel for consonant in SYLLABLE_CONSONANTS for vowel in SYLLABLE_VOWELS)
+
+
+class NameCorpus:
+    __slots__ = ("names", "sorted_names", "ranks")
+
+    def __init__(self, names: Iterable[str]) -> None:
+        names = tuple(names)
+        sorted_names = tuple(sorted(names))
+
+        object.__setattr__(self, "names", names)
+        object.__setattr__(self, "sorted_names", sorted_names)
+        object.__setattr__(self, "ranks", MappingProxyType({name: rank for rank, name in enumerate(sorted_names)}))
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError("NameCorpus is immutable")
+
+    def __reduce__(self) -> tuple:
+        return NameCorpus, (self.names,)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def sort(self, names: Iterable[str]) -> list[str]:
+        # Same order as sorted(names), without comparing the strings themselves
+        return sorted(names, key=self.ranks.__getitem__)
+
+
+class SyntheticNames(Sequence):
+    # Every name of min_syllables to max_syllables syllables, name i is built when it is read instead of being stored.
+    # Syllables always have two letters, so a name splits into syllables only one way and no two indices share a name.
+    def __init__(self, min_syllables: int = 2, max_syllables: int = 4) -> None:
+        if not 1 <= min_syllables <= max_syllables:
+            raise ValueError("Need 1 <= min_syllables <= max_syllables")
+
+        self.min_syllables: int = min_syllables
+        self.max_syllables: int = max_syllables
+        self.block_sizes: list[int] = [len(SYLLABLES) ** num_syllables for num_syllables in range(min_syllables, max_syllables + 1)]
+        self.size: int = sum(self.block_sizes)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, index: int) -> str:
+        if not isinstance(index, int):
+            raise TypeError("SyntheticNames only supports integer indices")
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("name index out of range")
+
+        # Names with fewer syllables come first, within a length index is the base len(SYLLABLES) number of the syllables
+        num_syllables = self.min_syllables
+        for block_size in self.block_sizes:
+            if index < block_size:
+                break
+            index -= block_size
+            num_syllables += 1
+
+        syllables = [""] * num_syllables
+        for i in range(num_syllables - 1, -1, -1):
+            index, syllable = divmod(index, len(SYLLABLES))
+            syllables[i] = SYLLABLES[syllable]
+        return "".join(syllables).capitalize()
+
+    def __contains__(self, name: object) -> bool:
+        if not isinstance(name, str) or len(name) % 2 or not self.min_syllables <= len(name) // 2 <= self.max_syllables or name != name.capitalize():
+            return False
+        name = name.lower()
+        return all(name[i] in SYLLABLE_CONSONANTS and name[i + 1] in SYLLABLE_VOWELS for i in range(0, len(name), 2))
+
+
+class SyntheticNameCorpus:
+    # Stands in for a NameCorpus with far more names than any list of real ones, about 24 million by default.
+    # Problems draw from it with rng.sample like from any other corpus, which only builds the sampled names.
+    def __init__(self, min_syllables: int = 2, max_syllables: int = 4) -> None:
+        self.names: SyntheticNames = SyntheticNames(min_syllables, max_syllables)
+
+    def __reduce__(self) -> tuple:
+        return SyntheticNameCorpus, (self.names.min_syllables, self.names.max_syllables)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def sort(self, names: Iterable[str]) -> list[str]:
+        return sorted(names)
+
+
+def load_name_corpus(path: str) -> NameCorpus:
+    with open(path) as f:
+        return NameCorpus(json.load(f)["names"])
+
+
+_corpus_loaders: dict[str, Callable[[], NameCorpus | SyntheticNameCorpus]] = {
+    "default": lambda: load_name_corpus(NAMES_PATH),
+    "synthetic": SyntheticNameCorpus
+}
+_corpora: dict[str, NameCorpus | SyntheticNameCorpus] = {}
+
+
+def register_name_corpus(name: str, source: str | Iterable[str] | Callable[[], NameCorpus | SyntheticNameCorpus]) -> None:
+    # source can be a path to a names.json style file, an iterable of names or a loader returning a NameCorpus
+    if isinstance(source, str):
+        _corpus_loaders[name] = lambda: load_name_corpus(source)
+    elif callable(source):
+        _corpus_loaders[name] = source
+    else:
+        corpus = NameCorpus(source)
+        _corpus_loaders[name] = lambda: corpus
+
+    _corpora.pop(name, None)
+
+def get_name_corpus(name: str = "default") -> NameCorpus | SyntheticNameCorpus:
+    corpus = _corpora.get(name)
+    if corpus is None:
+        if name not in _corpus_loaders:
+            raise ValueError(f"Unknown name corpus '{name}'. Available corpora: {', '.join(_corpus_loaders)}")
+        corpus = _corpora[name] = _corpus_loaders[name]()
+
+    return corpus
@@ -0,0 +1,109 @@
+MT_N: int = 624
+MT_M: int = 397
+_UPPER_MASK: int = 0x80000000
+_LOWER_MASK: int = 0x7fffffff
+_MATRIX_A: int = 0x9908b0df
+SEED_CHUNK: int = 16384  # Seeds set up together, the 624 state words of a chunk take 40 MB
+
+_initial_state = None
+
+
+def _genrand_state(np):
+    # init_genrand(19650218), where init_by_array starts for every seed
+    global _initial_state
+    if _initial_state is None:
+        state = [19650218]
+        for i in range(1, MT_N):
+            state.append((1812433253 * (state[-1] ^ (state[-1] >> 30)) + i) & 0xffffffff)
+        _initial_state = np.array(state, dtype=np.uint32)
+    return _initial_state
+
+def python_random_words(seeds: list[int], num_words: int):
+    # The first num_words 32 bit outputs of random.Random(seed) for each seed, as a (len(seeds), num_words) uint32 array.
+    # CPython's Mersenne Twister seeding and first twist are replayed with one numpy operation per step for a whole chunk
+    # of seeds, getrandbits(k) of a fresh Random(seed) is then the next word >> (32 - k) for k <= 32.
+    import numpy as np
+
+    if not 0 <= num_words <= MT_N:
+        raise ValueError(f"num_words must be between 0 and {MT_N}")
+
+    words = np.empty((len(seeds), num_words), dtype=np.uint32)
+    keys = [abs(seed) for seed in seeds]
+    by_key_length: dict[int, list[int]] = {}
+    for i, key in enumerate(keys):
+        by_key_length.setdefault(max(1, (key.bit_length() + 31) // 32), []).append(i)
+
+    for key_length, indices in by_key_length.items():
+        for start in range(0, len(indices), SEED_CHUNK):
+            chunk = indices[start:start + SEED_CHUNK]
+            key = np.array([[(keys[i] >> (32 * word)) & 0xffffffff for i in chunk] for word in range(key_length)], dtype=np.uint32)
+            words[chunk] = _first_words(np, key, num_words).T
+
+    return words
+
+def _first_words(np, key, num_words: int):
+    # init_by_array with one key per column, then the first twist and tempering, see _randommodule.c.
+    # A row keeps its value from init_genrand until init_by_array first updates it, so it is only filled in then.
+    num_keys, num_seeds = key.shape
+    initial = _genrand_state(np)
+    mt = np.empty((MT_N, num_seeds), dtype=np.uint32)
+    mt[0] = initial[0]
+    rows, key_rows = list(mt), list(key)
+    is_set = [True] + [False] * (MT_N - 1)
+    scratch = np.empty(num_seeds, dtype=np.uint32)
+
+    def mix(i: int, multiplier) -> None:
+        # scratch = mt[i] ^ ((mt[i - 1] ^ (mt[i - 1] >> 30)) * multiplier)
+        np.right_shift(rows[i - 1], 30, out=scratch)
+        np.bitwise_xor(scratch, rows[i - 1], out=scratch)
+        np.multiply(scratch, multiplier, out=scratch)
+        np.bitwise_xor(scratch, rows[i] if is_set[i] else initial[i], out=scratch)
+
+    first_multiplier, second_multiplier = np.uint32(1664525), np.uint32(1566083941)
+    i, j = 1, 0
+    for _ in range(max(MT_N, num_keys)):
+        mix(i, first_multiplier)
+        if j:
+            np.add(scratch, np.uint32(j), out=scratch)
+        np.add(scratch, key_rows[j], out=rows[i])
+        is_set[i] = True
+        i += 1
+        j += 1
+        if i >= MT_N:
+            rows[0][:] = rows[MT_N - 1]
+            i = 1
+        if j >= num_keys:
+            j = 0
+    for _ in range(MT_N - 1):
+        mix(i, second_multiplier)
+        np.subtract(scratch, np.uint32(i), out=rows[i])
+        i += 1
+        if i >= MT_N:
+            rows[0][:] = rows[MT_N - 1]
+            i = 1
+    rows[0][:] = _UPPER_MASK
+
+    def twist(current, following, far):
+        y = (current & np.uint32(_UPPER_MASK)) | (following & np.uint32(_LOWER_MASK))
+        return far ^ (y >> 1) ^ ((y & 1) * np.uint32(_MATRIX_A))
+
+    # The twist updates the state in order, each block only reads words that are already final or not yet updated.
+    # Words past num_words are never read, so they are left alone.
+    split = MT_N - MT_M
+    end = min(num_words, split)
+    mt[:end] = twist(mt[:end], mt[1:end + 1], mt[MT_M:MT_M + end])
+    if num_words > split:
+        end = min(num_words, 2 * split)
+        mt[split:end] = twist(mt[split:end], mt[split + 1:end + 1], mt[:end - split])
+    if num_words > 2 * split:
+        end = min(num_words, MT_N - 1)
+        mt[2 * split:end] = twist(mt[2 * split:end], mt[2 * split + 1:end + 1], mt[split:end - split])
+    if num_words == MT_N:
+        mt[MT_N - 1] = twist(mt[MT_N - 1], mt[0], mt[MT_M - 1])
+
+    y = mt[:num_words]
+    y ^= y >> 11
+    y ^= (y << 7) & np.uint32(0x9d2c5680)
+    y ^= (y << 15) & np.uint32(0xefc60000)
+    y ^= y >> 18
+    return y